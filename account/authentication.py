@@ -1,6 +1,18 @@
+from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 
 from .models import User
+from .tokens import claims_user
+
+USER_SNAPSHOT_KEY = "user-snapshot:{}"
 
 
 class PhoneEmailAuthBackend(BaseBackend):
@@ -21,3 +33,69 @@ class PhoneEmailAuthBackend(BaseBackend):
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
             return None
+
+
+def get_user_snapshot(user_id):
+    """The user with its photo, from a short-lived cache entry."""
+    key = USER_SNAPSHOT_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.select_related("photo").filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_user_snapshot(user_id):
+    key = USER_SNAPSHOT_KEY.format(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that reads users from cached snapshots.
+
+    With ``JWT_STATELESS_USERS`` on, safe requests to views that set
+    ``stateless_auth = True`` get a user built from the token claims and no
+    lookup at all.
+    """
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def accepts_claims_user(self):
+        request = getattr(self, "request", None)
+        if not settings.JWT_STATELESS_USERS or request is None:
+            return False
+        view = request.parser_context.get("view")
+        return request.method in SAFE_METHODS and getattr(
+            view, "stateless_auth", False
+        )
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+        if self.accepts_claims_user():
+            user = claims_user(validated_token)
+            if user is not None:
+                return user
+
+        user = get_user_snapshot(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from account.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted tokens in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(options["chunk_size"], options["pause"])
+        self.stdout.write(f"Deleted {deleted} expired tokens")
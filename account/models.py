@@ -1,10 +1,8 @@
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.db import models
-from django.db.models import Sum
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from common.models import Media
-from subject.models import UserTotalTestResult
 from .managers import CustomUserManager
 
 
@@ -38,10 +36,7 @@ class User(AbstractUser, PermissionsMixin):
 
     @property
     def user_total_ball(self):
-        filtered_user_results = UserTotalTestResult.objects.filter(user=self)
-        total_ball = (
-            filtered_user_results.aggregate(total_ball=Sum("ball"))["total_ball"]
-            / filtered_user_results.count()
-        )
-
-        return total_ball
\ No newline at end of file
+        rollup = getattr(self, "score_rollup", None)
+        if rollup is None or not rollup.attempts_count:
+            return 0
+        return rollup.total_ball / rollup.attempts_count
\ No newline at end of file
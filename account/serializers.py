@@ -12,7 +12,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
-    photo = MediaURlSerializer(read_only=True)
+    photo = MediaURlSerializer(read_only=True, preset="thumb")
 
     class Meta:
         model = User
@@ -20,7 +20,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
-    photo = MediaURlSerializer(read_only=True)
+    photo = MediaURlSerializer(read_only=True, preset="thumb")
 
     class Meta:
         model = User
@@ -33,7 +33,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "photo",
             "birth_date",
             "gender",
+            "user_total_ball",
         )
+        read_only_fields = ("user_total_ball",)
 
 
 class ResetPasswordStartSerializer(serializers.Serializer):
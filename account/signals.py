@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from account.authentication import forget_user_snapshot
+from account.models import User
+from account.tokens import forget_blacklisted, remember_blacklisted
+from common.models import Media
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user_snapshot(instance.pk)
+
+
+@receiver([post_save, pre_delete], sender=Media)
+def photo_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    for user_id in User.objects.filter(photo=instance).values_list("id", flat=True):
+        forget_user_snapshot(user_id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def token_blacklisted(sender, instance, **kwargs):
+    remember_blacklisted(instance.token.jti, instance.token.expires_at)
+
+
+@receiver(post_delete, sender=BlacklistedToken)
+def token_unblacklisted(sender, instance, origin=None, **kwargs):
+    # Rows removed along with their expired outstanding token need no cleanup.
+    if isinstance(origin, OutstandingToken) or getattr(origin, "model", None) is (
+        OutstandingToken
+    ):
+        return
+    forget_blacklisted(instance.token.jti)
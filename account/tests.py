@@ -1,3 +1,219 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from account.models import User
+from account.tokens import (
+    CachedRefreshToken,
+    UserTokenObtainPairSerializer,
+    prune_expired_tokens,
+)
+from account.views import LoginView
+from common.throttling import TokenBucketThrottle
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", password="pass", first_name="Ali"
+        )
+        token = UserTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            query for query in queries if 'FROM "account_user"' in query["sql"]
+        ]
+
+    def test_users_are_read_from_the_snapshot_until_saved(self):
+        url = reverse("profile")
+        _, queries = self.user_queries(url)
+        self.assertEqual(len(queries), 1)
+        _, queries = self.user_queries(url)
+        self.assertEqual(queries, [])
+
+        self.user.first_name = "Vali"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response, queries = self.user_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data["first_name"], "Vali")
+
+    def test_deactivated_users_are_rejected(self):
+        self.user_queries(reverse("profile"))
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 401)
+
+    @override_settings(JWT_STATELESS_USERS=True)
+    def test_stateless_mode_uses_token_claims_on_opted_in_views(self):
+        url = reverse("subject-leaderboard", kwargs={"pk": 1})
+        _, queries = self.user_queries(url)
+        self.assertEqual(queries, [])
+        _, queries = self.user_queries(reverse("profile"))
+        self.assertEqual(len(queries), 1)
+
+
+class TokenBlacklistTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": str(token)})
+
+    def test_blacklist_check_is_served_from_the_cache(self):
+        token = CachedRefreshToken.for_user(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            token.check_blacklist()
+            token.check_blacklist()
+        self.assertEqual(len(queries), 1)
+
+        token.blacklist()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_a_stale_database_read_never_hides_a_blacklisting(self):
+        token = CachedRefreshToken.for_user(self.user)
+        exists = BlacklistedToken.objects.filter(token__jti=token["jti"]).exists
+
+        def blacklisted_meanwhile():
+            result = exists()
+            token.blacklist()
+            return result
+
+        with mock.patch.object(
+            BlacklistedToken.objects, "filter"
+        ) as filter_blacklisted:
+            filter_blacklisted.return_value.exists = blacklisted_meanwhile
+            with self.assertRaises(TokenError):
+                token.check_blacklist()
+        with self.assertNumQueries(0), self.assertRaises(TokenError):
+            token.check_blacklist()
+
+    def test_rotated_tokens_cannot_be_reused(self):
+        token = UserTokenObtainPairSerializer.get_token(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+
+    def test_admin_blacklisting_updates_the_cache(self):
+        token = CachedRefreshToken.for_user(self.user)
+        token.check_blacklist()
+        outstanding = OutstandingToken.objects.get(jti=token["jti"])
+        blacklisted = BlacklistedToken.objects.create(token=outstanding)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        blacklisted.delete()
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_prune_deletes_expired_tokens_only(self):
+        live = CachedRefreshToken.for_user(self.user)
+        expired = [CachedRefreshToken.for_user(self.user) for _ in range(3)]
+        for token in expired:
+            token.blacklist()
+        OutstandingToken.objects.filter(
+            jti__in=[token["jti"] for token in expired]
+        ).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(prune_expired_tokens(chunk_size=2), 3)
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list("jti", flat=True)),
+            [live["jti"]],
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "throttle": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "throttle",
+        },
+    },
+    THROTTLE_CACHE="throttle",
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {"login": "2/min"},
+    },
+)
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["throttle"].clear()
+        self.client = APIClient()
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            TokenBucketThrottle, "timer", lambda throttle: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self):
+        return self.client.post(
+            reverse("token_obtain_pair"),
+            {"email": "nobody@example.com", "password": "wrong"},
+        )
+
+    def test_bursts_are_rejected_without_queries_until_refilled(self):
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+        self.now += 30
+        self.assertEqual(self.login().status_code, 401)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertTrue(caches["throttle"].get("throttle:login:127.0.0.1"))
+
+    def test_parallel_requests_cannot_overspend_the_bucket(self):
+        request = Request(APIRequestFactory().post("/"))
+        request.user = AnonymousUser()
+        view = LoginView()
+        barrier = threading.Barrier(10)
+
+        def attempt():
+            barrier.wait()
+            return TokenBucketThrottle().allow_request(request, view)
+
+        read = LocMemCache.get
+
+        def slow_read(cache, *args, **kwargs):
+            value = read(cache, *args, **kwargs)
+            time.sleep(0.001)
+            return value
+
+        with mock.patch.object(LocMemCache, "get", slow_read), ThreadPoolExecutor(
+            max_workers=10
+        ) as executor:
+            allowed = list(executor.map(lambda _: attempt(), range(10)))
+        self.assertEqual(allowed.count(True), 2)
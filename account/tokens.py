@@ -0,0 +1,134 @@
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import User
+
+# User fields copied into tokens, enough to act as the user on read requests.
+USER_CLAIMS = ("email", "role", "is_staff")
+
+# Blacklist state of a refresh token by jti, kept until the token expires.
+BLACKLIST_KEY = "token-blacklist:{}"
+
+
+def _lifetime(exp):
+    return max(int(exp - time.time()), 1)
+
+
+def is_blacklisted(jti, exp):
+    """Whether a token is blacklisted, asking the database once per token."""
+    key = BLACKLIST_KEY.format(jti)
+    blacklisted = cache.get(key)
+    if blacklisted is None:
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        # ``add`` never replaces a True written by a concurrent blacklisting.
+        if not cache.add(key, blacklisted, timeout=_lifetime(exp)):
+            blacklisted = blacklisted or bool(cache.get(key))
+    return blacklisted
+
+
+def remember_blacklisted(jti, expires_at):
+    cache.set(
+        BLACKLIST_KEY.format(jti), True, timeout=_lifetime(expires_at.timestamp())
+    )
+
+
+def forget_blacklisted(jti):
+    cache.delete(BLACKLIST_KEY.format(jti))
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check is served from the cache.
+
+    Blacklisting and outstanding rows are written with the user id from the
+    token, without loading the user.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload["exp"]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def outstand(self):
+        return OutstandingToken.objects.get_or_create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            defaults={
+                "user_id": self.payload.get(api_settings.USER_ID_CLAIM),
+                "created_at": self.current_time,
+                "token": str(self),
+                "expires_at": datetime_from_epoch(self.payload["exp"]),
+            },
+        )
+
+    def blacklist(self):
+        token, _ = self.outstand()
+        blacklisted = BlacklistedToken.objects.get_or_create(token=token)
+        remember_blacklisted(token.jti, token.expires_at)
+        return blacklisted
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
+
+
+def claims_user(token):
+    """
+    An unsaved ``User`` built from token claims, or ``None`` when the token
+    does not carry them. Only fit for reading by id, role and staff status.
+    """
+    if not all(claim in token for claim in USER_CLAIMS):
+        return None
+    user = User(
+        id=token[api_settings.USER_ID_CLAIM],
+        is_active=True,
+        **{claim: token[claim] for claim in USER_CLAIMS},
+    )
+    user._state.adding = False
+    return user
+
+
+def prune_expired_tokens(chunk_size=1000, pause=0.0):
+    """
+    Delete expired outstanding tokens in small chunks, each in its own short
+    transaction; their blacklist rows go with them. Returns the number of deleted
+    outstanding tokens.
+    """
+    deleted = 0
+    now = timezone.now()
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return deleted
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
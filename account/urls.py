@@ -1,5 +1,5 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
     UserRegisterVerifyView,
@@ -8,12 +8,13 @@ from .views import (
     SetNewPasswordView,
     UserProfileView,
     LogoutAPIView,
+    LoginView,
 )
 
 urlpatterns = [
     path("register/", UserRegisterView.as_view(), name="register"),
     path("register/verify/", UserRegisterVerifyView.as_view(), name="register-verify"),
-    path("login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("login/", LoginView.as_view(), name="token_obtain_pair"),
     path("logout/", LogoutAPIView.as_view(), name="logout"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("user/profile", UserProfileView.as_view(), name="profile"),
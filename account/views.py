@@ -8,8 +8,9 @@ from rest_framework.generics import (
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from common.throttling import TokenBucketThrottle
 from .models import User
 from .serializers import (
     ResetPasswordVerifySerializer,
@@ -18,6 +19,7 @@ from .serializers import (
     UserRegisterSerializer,
     LogoutSerializer,
 )
+from .tokens import CachedRefreshToken
 
 code = openapi.Parameter(name="code", in_=openapi.IN_QUERY, type=openapi.TYPE_STRING)
 auth_token = openapi.Parameter(
@@ -27,9 +29,16 @@ auth_token = openapi.Parameter(
 query = openapi.Parameter(name="query", in_=openapi.IN_QUERY, type=openapi.TYPE_STRING)
 
 
+class LoginView(TokenObtainPairView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "login"
+
+
 class UserRegisterView(CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegisterSerializer
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "register"
 
     def perform_create(self, serializer):
         user = serializer.save(is_active=False)
@@ -66,6 +75,8 @@ class UserRegisterVerifyView(CreateAPIView):
 
 class ResetPasswordVerifyView(CreateAPIView):
     serializer_class = ResetPasswordVerifySerializer
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "reset_password"
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -110,7 +121,7 @@ class LogoutAPIView(APIView):
         refresh_token = serializer.validated_data['refresh_token']
 
         try:
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful"}, status=status.HTTP_200_OK)
         except Exception:
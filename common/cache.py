@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+_missing = object()
+
+# Every VersionedCache by namespace, for reporting.
+registry = {}
+
+
+def incr(key, delta=1):
+    """Atomically add ``delta`` to a counter in the cache, creating it if needed."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def redis_client(alias="default"):
+    """
+    Raw client behind a cache when it is Redis, else ``None``, for data
+    structures and atomic updates the cache API has no room for.
+    """
+    backend = caches[alias]
+    if not isinstance(backend, RedisCache):
+        return None
+    return backend._cache.get_client(write=True)
+
+
+class LocalLRU:
+    """A small thread-safe LRU mapping that lives in the current process."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedCache:
+    """
+    Values rebuilt whenever the version of their scope is bumped.
+
+    A scope (e.g. one step test) holds several named parts that share its
+    version. Version counters live in the configured Django cache so that
+    every process sees a bump. Values are stored under ``(scope, part,
+    version)`` in a process-local LRU in front of the same cache, so a local
+    hit costs one version read and no unpickling. A lost version key is
+    re-created from the clock, which keeps it ahead of any version a process
+    may still hold locally.
+
+    With ``track_stats`` local hits, shared hits and misses are counted in the
+    cache; see ``stats()``.
+    """
+
+    STATS = ("local_hits", "hits", "misses")
+
+    def __init__(
+        self, namespace, timeout=60 * 60 * 24, local_size=128, track_stats=False
+    ):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local = LocalLRU(local_size)
+        self.track_stats = track_stats
+        registry[namespace] = self
+
+    def _version_key(self, scope):
+        return f"{self.namespace}:{scope}:version"
+
+    def _value_key(self, scope, part, version):
+        return f"{self.namespace}:{scope}:{part}:{version}"
+
+    def get_version(self, scope):
+        key = self._version_key(scope)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            version = cache.get(key)
+        return version
+
+    def bump(self, scope):
+        key = self._version_key(scope)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            version = time.time_ns() // 1000
+            cache.set(key, version, timeout=None)
+            return version
+
+    def get_or_build(self, scope, part, builder):
+        """Return ``part`` of ``scope`` for the current version, building it once."""
+        version = self.get_version(scope)
+        local_key = (scope, part, version)
+        value = self.local.get(local_key, _missing)
+        if value is not _missing:
+            self._count("local_hits")
+            return value
+        key = self._value_key(scope, part, version)
+        value = cache.get(key, _missing)
+        if value is _missing:
+            self._count("misses")
+            value = builder()
+            cache.set(key, value, timeout=self.timeout)
+        else:
+            self._count("hits")
+        self.local.set(local_key, value)
+        return value
+
+    def _stats_key(self, name):
+        return f"{self.namespace}:stats:{name}"
+
+    def _count(self, name):
+        if self.track_stats:
+            incr(self._stats_key(name))
+
+    def stats(self):
+        values = cache.get_many([self._stats_key(name) for name in self.STATS])
+        return {name: values.get(self._stats_key(name), 0) for name in self.STATS}
@@ -0,0 +1,114 @@
+import mimetypes
+import mmap
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+
+from common.media import is_content_path
+
+_range = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Every file is served after an access check, so only the client may cache it.
+# Content-addressed files never change, so the client may keep them for good.
+PRIVATE = "private"
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` of a single ``bytes=`` range, with ``end`` inclusive.
+
+    Returns ``None`` for a missing or unsupported header, which means the
+    whole file is sent, and raises ``ValueError`` when the range cannot be
+    satisfied.
+    """
+    match = _range.match(header.replace(" ", "")) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _mapped_chunks(path, start, end, chunk_size):
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        position = start
+        while position <= end:
+            stop = min(position + chunk_size, end + 1)
+            yield mapped[position:stop]
+            position = stop
+
+
+def _validators(name, stat):
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    headers = {"ETag": etag, "Last-Modified": http_date(stat.st_mtime)}
+    headers["Cache-Control"] = IMMUTABLE if is_content_path(name) else PRIVATE
+    return headers
+
+
+def offloaded_response(name, path):
+    """Empty response telling the front server to send the file itself."""
+    response = HttpResponse(content_type=mimetypes.guess_type(path)[0] or "")
+    if settings.MEDIA_SENDFILE_BACKEND == "x-accel-redirect":
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + name
+    else:
+        response["X-Sendfile"] = path
+    response["Cache-Control"] = IMMUTABLE if is_content_path(name) else PRIVATE
+    return response
+
+
+def streamed_response(request, name, path):
+    """
+    Send a file from Python, honouring a single ``Range`` request.
+
+    Ranges are read from a memory-mapped file in chunks of
+    ``MEDIA_STREAM_CHUNK_SIZE`` bytes.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    headers = _validators(name, stat)
+    headers["Accept-Ranges"] = "bytes"
+    if request.headers.get("If-None-Match") == headers["ETag"]:
+        return HttpResponse(status=304, headers=headers)
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if_range = request.headers.get("If-Range")
+    header = request.headers.get("Range")
+    if if_range and if_range not in (headers["ETag"], headers["Last-Modified"]):
+        header = None
+    try:
+        byte_range = parse_range(header, size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{size}"
+        return HttpResponse(status=416, headers=headers)
+    if byte_range is None or size == 0:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _mapped_chunks(path, start, end, settings.MEDIA_STREAM_CHUNK_SIZE),
+        status=206,
+        content_type=content_type,
+        headers=headers,
+    )
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(end - start + 1)
+    return response
@@ -1,3 +1,7 @@
 USER_TOTAL_TEST_RESULT_MSG = "User Test Result not found"
 
 TEST_ANSWERS_NOT_EXISTS = "Test answers not exists"
+
+TEST_QUESTION_NOT_IN_STEP_TEST = "Question does not belong to this step test"
+
+TEST_QUESTION_NOT_IN_PAPER = "Question is not part of this test paper"
@@ -0,0 +1,129 @@
+import hashlib
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+
+from common.cache import LocalLRU
+from common.media import absolute_url, media_url, walk_files
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Resized WebP copies of image media, built on first request.
+VARIANT_DIR = "media_variants"
+
+# Names of variants known to be stored, so their URLs can be served directly.
+_built = LocalLRU(settings.MEDIA_URL_CACHE_SIZE)
+
+
+def supports_variants(media):
+    return Image is not None and media.type == "image"
+
+
+def variant_key(media):
+    """
+    Stable key of a media file: its content hash, or its id followed by a
+    hash of its id and name.
+    """
+    if media.sha256:
+        return media.sha256
+    digest = hashlib.sha256(f"{media.pk}:{media.file.name}".encode()).hexdigest()
+    return f"{media.pk}-{digest[:32]}"
+
+
+def variant_name(media, preset):
+    key = variant_key(media)
+    return f"{VARIANT_DIR}/{preset}/{key[:2]}/{key}.webp"
+
+
+def is_variant_path(name):
+    return name.startswith(f"{VARIANT_DIR}/")
+
+
+def variant_source(name):
+    """The ``Media`` row a stored variant was built from, or ``None``."""
+    from common.models import Media
+
+    key = name.rsplit("/", 1)[-1].split(".", 1)[0]
+    pk, separator, _ = key.partition("-")
+    if separator:
+        media = Media.objects.filter(pk=pk).first() if pk.isdigit() else None
+    else:
+        media = Media.objects.filter(sha256=key).first()
+    if media is None or variant_key(media) != key:
+        return None
+    return media
+
+
+def build_variant(media, preset):
+    """
+    Store the ``preset`` variant of an image unless it exists, and return its
+    storage name.
+
+    The image is EXIF-rotated, shrunk to fit the preset's box and re-encoded
+    as WebP.
+    """
+    name = variant_name(media, preset)
+    if _built.get(name) or default_storage.exists(name):
+        _built.set(name, True)
+        return name
+    with media.file.open("rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.thumbnail(settings.MEDIA_IMAGE_PRESETS[preset])
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=settings.MEDIA_IMAGE_QUALITY)
+    saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+    if saved != name:
+        # Another process stored the same variant first.
+        default_storage.delete(saved)
+    _built.set(name, True)
+    return name
+
+
+def variant_url(media, preset, request=None):
+    """
+    URL of an image's ``preset`` variant.
+
+    Variants already built by this process are linked directly. Others link
+    to the view that builds them, which redirects to the stored file. Media
+    that cannot have variants get their original URL.
+    """
+    if not supports_variants(media):
+        return media_url(media, request)
+    name = variant_name(media, preset)
+    if _built.get(name):
+        return absolute_url(default_storage.url(name), request)
+    path = reverse("media-variant", kwargs={"pk": media.pk, "preset": preset})
+    if request is not None:
+        return request.build_absolute_uri(path)
+    return str(settings.HOST) + path
+
+
+def collect_variants(min_age=timedelta(days=1), dry_run=False):
+    """Delete variants of media that no longer exist. Returns their number."""
+    from common.models import Media
+
+    keys = set()
+    for media in Media.objects.filter(type="image").only("pk", "file", "sha256"):
+        keys.add(variant_key(media))
+    if not default_storage.exists(VARIANT_DIR):
+        return 0
+    cutoff = timezone.now() - min_age
+    deleted = 0
+    for path in walk_files(VARIANT_DIR):
+        key = path.rsplit("/", 1)[-1].split(".", 1)[0]
+        if key in keys or default_storage.get_modified_time(path) > cutoff:
+            continue
+        if not dry_run:
+            default_storage.delete(path)
+        deleted += 1
+    return deleted
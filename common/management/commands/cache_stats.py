@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from common.cache import registry
+
+
+class Command(BaseCommand):
+    help = "Show hit counters of the versioned caches that track them"
+
+    def handle(self, *args, **options):
+        for namespace, versioned_cache in sorted(registry.items()):
+            if not versioned_cache.track_stats:
+                continue
+            stats = versioned_cache.stats()
+            lookups = sum(stats.values())
+            hit_rate = (stats["local_hits"] + stats["hits"]) / lookups if lookups else 0
+            counters = " ".join(f"{name}={value}" for name, value in stats.items())
+            self.stdout.write(f"{namespace}: {counters} hit_rate={hit_rate:.1%}")
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from common.images import collect_variants
+from common.media import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete stored media blobs and image variants that no Media row uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age-hours",
+            type=float,
+            default=24,
+            help="Keep rows and blobs younger than this",
+        )
+        parser.add_argument(
+            "--prune-rows",
+            action="store_true",
+            help="Also delete Media rows that nothing refers to",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        min_age = timedelta(hours=options["min_age_hours"])
+        rows, blobs = collect_garbage(
+            min_age=min_age,
+            prune_rows=options["prune_rows"],
+            dry_run=options["dry_run"],
+        )
+        variants = collect_variants(min_age=min_age, dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            f"{verb} {rows} media rows, {blobs} blobs and {variants} image variants"
+        )
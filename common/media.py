@@ -0,0 +1,143 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from common.cache import LocalLRU
+
+# Uploads are stored under the SHA-256 of their content.
+CONTENT_DIR = "media_files"
+
+# Storage URL of every recently served file, keyed by ``(media id, file name)``.
+# A replaced file gets a new name, so entries never go stale.
+_paths = LocalLRU(settings.MEDIA_URL_CACHE_SIZE)
+
+
+def _storage_url(media):
+    key = (media.pk, media.file.name)
+    url = _paths.get(key)
+    if url is None:
+        url = media.file.url
+        _paths.set(key, url)
+    return url
+
+
+def base_url(request=None):
+    """Origin that relative media URLs are served from."""
+    if settings.MEDIA_BASE_URL:
+        return settings.MEDIA_BASE_URL
+    if request is not None:
+        return f"{request.scheme}://{request.get_host()}"
+    return str(settings.HOST)
+
+
+def media_url(media, request=None):
+    """
+    Absolute URL of a ``Media`` file.
+
+    Relative storage URLs are prefixed with ``MEDIA_BASE_URL`` when it is set
+    (e.g. a CDN), otherwise with the request's origin or ``HOST``. Storages
+    that return absolute URLs are used as they are.
+    """
+    return absolute_url(_storage_url(media), request)
+
+
+def absolute_url(url, request=None):
+    """Prefix a relative storage URL with the media origin."""
+    if url.startswith(("http://", "https://", "//")):
+        return url
+    return base_url(request).rstrip("/") + url
+
+
+def file_sha256(file):
+    """SHA-256 hex digest of a file, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def content_path(sha256, filename):
+    """Content-addressed storage path, e.g. ``media_files/ab/ab12....png``."""
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{CONTENT_DIR}/{sha256[:2]}/{sha256}{extension}"
+
+
+def is_content_path(name):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return (
+        name.startswith(f"{CONTENT_DIR}/")
+        and len(stem) == 64
+        and all(char in "0123456789abcdef" for char in stem)
+    )
+
+
+def referenced_media_ids():
+    """
+    Ids of ``Media`` rows that at least one foreign key points at.
+
+    Hidden relations, declared with ``related_name="+"``, are included.
+    """
+    from common.models import Media
+
+    referenced = set()
+    for relation in Media._meta.get_fields(include_hidden=True):
+        if not relation.auto_created or relation.concrete or relation.many_to_many:
+            continue
+        referenced.update(
+            relation.related_model._base_manager.filter(
+                **{f"{relation.field.name}__isnull": False}
+            ).values_list(relation.field.attname, flat=True)
+        )
+    return referenced
+
+
+def walk_files(directory, storage=default_storage):
+    """Every file under ``directory`` of a storage, walked lazily."""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f"{directory}/{name}"
+    for name in directories:
+        yield from walk_files(f"{directory}/{name}", storage)
+
+
+def stored_blobs(storage=default_storage):
+    """Every content-addressed file in a storage."""
+    return (path for path in walk_files(CONTENT_DIR, storage) if is_content_path(path))
+
+
+def collect_garbage(min_age=timedelta(days=1), prune_rows=False, dry_run=False):
+    """
+    Delete content-addressed blobs that no ``Media`` row uses.
+
+    With ``prune_rows`` ``Media`` rows no foreign key refers to are deleted
+    first, which orphans their blobs. Rows and blobs younger than ``min_age``
+    are kept so uploads not yet attached to their owner are not lost. Returns
+    the number of deleted rows and blobs.
+    """
+    from common.models import Media
+
+    cutoff = timezone.now() - min_age
+    deleted_rows = 0
+    if prune_rows:
+        orphans = Media.objects.filter(created_at__lte=cutoff).exclude(
+            pk__in=referenced_media_ids()
+        )
+        deleted_rows = orphans.count() if dry_run else orphans.delete()[0]
+
+    used = set(Media.objects.values_list("file", flat=True))
+    deleted_blobs = 0
+    if not default_storage.exists(CONTENT_DIR):
+        return deleted_rows, deleted_blobs
+    for path in stored_blobs():
+        if path in used or default_storage.get_modified_time(path) > cutoff:
+            continue
+        if not dry_run:
+            default_storage.delete(path)
+        deleted_blobs += 1
+    return deleted_rows, deleted_blobs
@@ -0,0 +1,79 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def is_json(response):
+    """Whether a response carries JSON, such as the API's responses."""
+    content_type = response.get("Content-Type", "").partition(";")[0].strip().lower()
+    return content_type == "application/json" or content_type.endswith("+json")
+
+
+def accepted_encodings(header):
+    """Content codings of an ``Accept-Encoding`` header with a non-zero q."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                continue
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, whichever the client accepts.
+
+    Brotli is preferred when the ``brotli`` package is installed. Only JSON
+    is compressed: HTML pages such as the admin and auth forms carry CSRF
+    tokens next to reflected input, which BREACH can recover from compressed
+    sizes. Responses smaller than ``RESPONSE_COMPRESSION_MIN_SIZE`` bytes,
+    streaming responses and responses that do not get smaller are sent as
+    they are.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not is_json(response):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_SIZE:
+            return response
+
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+            compressed = brotli.compress(
+                response.content, quality=settings.RESPONSE_BROTLI_QUALITY
+            )
+        elif "gzip" in accepted:
+            encoding = "gzip"
+            compressed = gzip.compress(
+                response.content, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0
+            )
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
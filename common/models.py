@@ -1,6 +1,35 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from common.media import content_path, file_sha256
+
+
+def media_upload_to(instance, filename):
+    if instance.sha256:
+        return content_path(instance.sha256, filename)
+    return f"media_files/{filename}"
+
+
+class MediaManager(models.Manager):
+    def store(self, file, type):
+        """
+        Return the ``Media`` holding the content of ``file``, and whether it
+        was created. Identical content shares one row and one blob.
+        """
+        sha256 = file_sha256(file)
+        media = self.filter(sha256=sha256).first()
+        if media is not None:
+            return media, False
+        media = self.model(type=type, file=file, sha256=sha256)
+        media._hashed_file = media.file.file
+        try:
+            with transaction.atomic():
+                media.save()
+        except IntegrityError:
+            return self.get(sha256=sha256), False
+        return media, True
 
 
 class Media(models.Model):
@@ -14,7 +43,7 @@ class Media(models.Model):
     type = models.CharField("type", max_length=50, choices=MediaType.choices)
     file = models.FileField(
         "file",
-        upload_to="media_files",
+        upload_to=media_upload_to,
         validators=[
             FileExtensionValidator(
                 allowed_extensions=["png", "jpg", "jpeg", "gif", "mp4", "mp3"]
@@ -22,13 +51,49 @@ class Media(models.Model):
         ],
     )
 
+    sha256 = models.CharField(
+        "SHA-256", max_length=64, unique=True, null=True, blank=True, editable=False
+    )
+    created_at = models.DateTimeField(
+        "created at", default=timezone.now, editable=False
+    )
+
+    objects = MediaManager()
+
+    def hash_upload(self):
+        """Hash a new, not yet stored upload and point it at its content path."""
+        if not self.file or self.file._committed:
+            return
+        if getattr(self, "_hashed_file", None) is not self.file.file:
+            self.sha256 = file_sha256(self.file)
+            self._hashed_file = self.file.file
+
     def clean(self):
+        self.hash_upload()
+        if self.sha256:
+            duplicate = (
+                Media.objects.filter(sha256=self.sha256).exclude(pk=self.pk).first()
+            )
+            if duplicate is not None:
+                raise ValidationError(
+                    f"The same file is already uploaded as media #{duplicate.pk}"
+                )
         if self.type not in self.MediaType.values:
             raise ValidationError("Invalid File Type")
         elif self.type == self.MediaType.IMAGE:
             if self.file.name.split(".")[-1] not in ["jpg", "jpeg", "png"]:
                 raise ValidationError("Invalid Image File")
 
+    def save(self, *args, **kwargs):
+        self.hash_upload()
+        if self.sha256 and not self.file._committed:
+            path = content_path(self.sha256, self.file.name)
+            if self.file.storage.exists(path):
+                # The blob is already stored: share it instead of uploading.
+                self.file.name = path
+                self.file._committed = True
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return str(self.file)
 
@@ -0,0 +1,132 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on a compound, unique ordering.
+
+    The cursor holds the ordering values of the last row of a page and the
+    next page is selected with a keyset condition, so a deep page costs the
+    same index range scan as the first one. The last ordering field must be
+    unique.
+    """
+
+    ordering = ("id",)
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request, queryset.model)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(cursor))
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[: self.page_size]
+        self.next_position = self.get_position(page[-1]) if self.has_next else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip("-")) for field in self.ordering]
+
+    def keyset_filter(self, position):
+        """Rows strictly after ``position`` in ``self.ordering``."""
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                other.lstrip("-"): value
+                for other, value in zip(self.ordering[:index], position)
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
+
+    def decode_cursor(self, request, model):
+        """
+        Position of the cursor in ``request``, each value converted by its
+        ordering field of ``model``.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        """
+        Link to the page after ``position``.
+
+        The link is built from the path, the page size and the cursor only,
+        so other query parameters of the request do not leak into cached
+        pages.
+        """
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(position, cls=DjangoJSONEncoder).encode()
+        ).decode()
+        url = self.request.build_absolute_uri(self.request.path)
+        if self.page_size != type(self).page_size:
+            url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class CategoryPagination(KeysetPagination):
+    ordering = ("-click_count", "id")
@@ -0,0 +1,234 @@
+import re
+import zlib
+from html import escape
+from html.parser import HTMLParser
+
+# Bodies at least this large are stored zlib-compressed.
+COMPRESS_MIN_SIZE = 1024
+
+# Only the markup the CKEditor configurations in settings can produce is kept.
+# Other tags are unwrapped, keeping their text, except DROPPED_TAGS, which are
+# removed with their content.
+ALLOWED_TAGS = {
+    "a",
+    "b",
+    "blockquote",
+    "br",
+    "caption",
+    "code",
+    "col",
+    "colgroup",
+    "del",
+    "div",
+    "em",
+    "figcaption",
+    "figure",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "i",
+    "img",
+    "input",
+    "label",
+    "li",
+    "mark",
+    "oembed",
+    "ol",
+    "p",
+    "pre",
+    "s",
+    "span",
+    "strong",
+    "sub",
+    "sup",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "tr",
+    "u",
+    "ul",
+}
+ALLOWED_ATTRS = {
+    "*": {"class", "style", "title", "dir", "lang"},
+    "a": {"href", "target", "rel"},
+    "col": {"span"},
+    "img": {"src", "alt", "width", "height"},
+    "input": {"type", "checked", "disabled"},
+    "oembed": {"url"},
+    "ol": {"start", "reversed", "type"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+    "ul": {"type"},
+}
+DROPPED_TAGS = {
+    "head",
+    "iframe",
+    "math",
+    "noscript",
+    "object",
+    "script",
+    "style",
+    "svg",
+    "template",
+    "title",
+}
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+PREFORMATTED_TAGS = {"pre"}
+BLOCK_TAGS = {
+    "blockquote",
+    "br",
+    "div",
+    "figcaption",
+    "figure",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "table",
+    "tr",
+    "ul",
+}
+URL_ATTRS = {"href", "src", "url"}
+SAFE_SCHEMES = {"http", "https", "mailto", "tel"}
+
+_whitespace = re.compile(r"\s+")
+_url_noise = re.compile(r"[\s\x00-\x1f]+")
+_url_scheme = re.compile(r"([a-z][a-z0-9+.\-]*):")
+_unsafe_style = re.compile(r"url\s*\(|expression\s*\(|@import|javascript:|\\", re.I)
+
+
+def _is_safe_url(value, image=False):
+    value = _url_noise.sub("", value or "").lower()
+    if image and value.startswith("data:image/"):
+        return True
+    scheme = _url_scheme.match(value)
+    return scheme is None or scheme.group(1) in SAFE_SCHEMES
+
+
+def _is_allowed_attr(tag, name, value):
+    if name not in ALLOWED_ATTRS["*"] and name not in ALLOWED_ATTRS.get(tag, ()):
+        return False
+    if name in URL_ATTRS:
+        return _is_safe_url(value, image=tag == "img")
+    if name == "style":
+        return not _unsafe_style.search(value or "")
+    return True
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.dropped = 0
+        self.preformatted = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropped += 1
+            return
+        if self.dropped or tag not in ALLOWED_TAGS:
+            return
+        parts = [tag]
+        for name, value in attrs:
+            if _is_allowed_attr(tag, name, value):
+                parts.append(name if value is None else f'{name}="{escape(value)}"')
+        self.html.append(f"<{' '.join(parts)}>")
+        if tag in PREFORMATTED_TAGS:
+            self.preformatted += 1
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped = max(self.dropped - 1, 0)
+            return
+        if self.dropped or tag in VOID_TAGS or tag not in ALLOWED_TAGS:
+            return
+        self.html.append(f"</{tag}>")
+        if tag in PREFORMATTED_TAGS:
+            self.preformatted = max(self.preformatted - 1, 0)
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        if not self.preformatted:
+            data = _whitespace.sub(" ", data)
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+
+def render(html):
+    """
+    Sanitize and minify CKEditor HTML.
+
+    Returns the cleaned HTML and a plain-text extract. Only ALLOWED_TAGS and
+    ALLOWED_ATTRS are kept and URLs must use a safe scheme. Comments are
+    dropped and whitespace outside ``<pre>`` is collapsed.
+    """
+    renderer = _Renderer()
+    renderer.feed(html or "")
+    renderer.close()
+    lines = (
+        _whitespace.sub(" ", line).strip()
+        for line in "".join(renderer.text).split("\n")
+    )
+    return "".join(renderer.html).strip(), "\n".join(line for line in lines if line)
+
+
+def pack(text):
+    """Encode rendered HTML for storage, compressing large bodies."""
+    data = text.encode()
+    if len(data) >= COMPRESS_MIN_SIZE:
+        compressed = zlib.compress(data, 6)
+        if len(compressed) < len(data):
+            return b"z" + compressed
+    return b"=" + data
+
+
+def unpack(data):
+    data = bytes(data)
+    if data[:1] == b"z":
+        return zlib.decompress(data[1:]).decode()
+    return data[1:].decode()
+
+
+def prerender(instance, field_name):
+    """Fill ``<field>_rendered`` and ``<field>_text`` from a rich-text field."""
+    rendered, text = render(getattr(instance, field_name))
+    setattr(instance, f"{field_name}_rendered", pack(rendered))
+    setattr(instance, f"{field_name}_text", text)
@@ -1,10 +1,28 @@
-from django.conf import settings
 from rest_framework import serializers
 
+from common import richtext
+from common.images import variant_url
+from common.media import media_url
+
 
 class MediaURlSerializer(serializers.Serializer):
+    """URL of a media file, or of its image variant when ``preset`` is given."""
+
+    def __init__(self, *args, preset=None, **kwargs):
+        self.preset = preset
+        super().__init__(*args, **kwargs)
+
     def to_representation(self, obj):
-        try:
-            return self.context["request"].build_absolute_uri(obj.file.url)
-        except Exception:
-            return str(settings.HOST) + str(obj.file.url)
\ No newline at end of file
+        if self.preset is not None:
+            return variant_url(obj, self.preset, self.context.get("request"))
+        return media_url(obj, self.context.get("request"))
+
+
+class RichTextField(serializers.CharField):
+    """Reads the pre-rendered form of a rich-text field and writes raw HTML."""
+
+    def get_attribute(self, instance):
+        rendered = getattr(instance, f"{self.source}_rendered", None)
+        if rendered is None:
+            return super().get_attribute(instance)
+        return richtext.unpack(rendered)
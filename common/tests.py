@@ -1,3 +1,276 @@
-from django.test import TestCase
+import gzip
+import io
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from common import images, richtext
+from common.images import variant_url
+from common.media import collect_garbage, media_url
+from common.delivery import parse_range
+from common.middleware import CompressionMiddleware, accepted_encodings
+from common.models import Media
+from common.renderers import FastJSONRenderer
+from subject.models import Category, Subject
+
+
+class RichTextTest(SimpleTestCase):
+    def test_render_sanitizes_and_minifies(self):
+        html, text = richtext.render(
+            '<p onclick="x()">Hello\n   <b>world</b></p>\n<!-- note -->'
+            "<script>alert(1)</script>"
+            '<a href=" javascript:alert(1)">link</a><img src="data:image/png;base64,AA">'
+            "<pre>a\n  b</pre>"
+        )
+        self.assertEqual(
+            html,
+            "<p>Hello <b>world</b></p> <a>link</a>"
+            '<img src="data:image/png;base64,AA"><pre>a\n  b</pre>',
+        )
+        self.assertEqual(text, "Hello world\nlink\na\nb")
+
+    def test_render_keeps_only_allowed_markup(self):
+        vectors = (
+            '<svg><a><animate attributename="href" values="javascript:alert(1)">'
+            "</animate><text>x</text></a></svg>",
+            '<meta http-equiv="refresh" content="0;url=javascript:alert(1)">',
+            '<base href="https://evil.example/">',
+            '<a href="data:text/html,x" style="background:url(x)">a</a>',
+            '<form action="https://evil.example/"><button formaction="x">b</button></form>',
+        )
+        self.assertEqual(
+            [richtext.render(html)[0] for html in vectors],
+            ["", "", "", "<a>a</a>", "b"],
+        )
+        html, _ = richtext.render(
+            '<figure class="table"><table><tr><td colspan="2" style="color:red">'
+            '<a href="https://example.com" target="_blank">x</a></td></tr></table>'
+            '</figure><ol start="3"><li><span class="mark">y</span></li></ol>'
+        )
+        self.assertEqual(
+            html,
+            '<figure class="table"><table><tr><td colspan="2" style="color:red">'
+            '<a href="https://example.com" target="_blank">x</a></td></tr></table>'
+            '</figure><ol start="3"><li><span class="mark">y</span></li></ol>',
+        )
+
+    def test_pack_compresses_large_bodies(self):
+        small = "<p>short</p>"
+        large = "<p>repeated text</p>" * 200
+        self.assertEqual(richtext.pack(small)[:1], b"=")
+        self.assertLess(len(richtext.pack(large)), len(large) // 10)
+        for body in (small, large):
+            self.assertEqual(richtext.unpack(memoryview(richtext.pack(body))), body)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_output_matches_json_renderer(self):
+        data = {
+            "text": "Savol \u2028 <p>",
+            "when": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "ball": Decimal("1.5"),
+            "items": [1, 2.5, None, True],
+            7: "int key",
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTest(SimpleTestCase):
+    def process(self, body, accept_encoding, content_type="application/json"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = HttpResponse(body, content_type=content_type)
+        response["ETag"] = '"v1"'
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_gzip_is_negotiated_above_the_threshold(self):
+        body = b'{"question":"<p>text</p>"}' * 20
+        response = self.process(body, "gzip;q=0.5, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response["ETag"], 'W/"v1"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_small_or_unaccepted_responses_are_sent_as_is(self):
+        self.assertFalse(self.process(b"{}", "gzip").has_header("Content-Encoding"))
+        self.assertFalse(
+            self.process(b"x" * 200, "gzip;q=0").has_header("Content-Encoding")
+        )
+
+    def test_only_json_is_compressed(self):
+        body = b"<input name='csrfmiddlewaretoken' value='token'>" * 20
+        for content_type in ("text/html; charset=utf-8", "text/plain"):
+            response = self.process(body, "gzip", content_type)
+            self.assertFalse(response.has_header("Content-Encoding"))
+        response = self.process(body, "gzip", "application/problem+json")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_accepted_encodings_honour_q_values(self):
+        self.assertEqual(
+            accepted_encodings("gzip, deflate;q=0, br;q=0.8"), {"gzip", "br"}
+        )
+
+
+class MediaURLTest(SimpleTestCase):
+    media = Media(pk=1, file="media_files/a.png")
+
+    @override_settings(
+        MEDIA_BASE_URL="", HOST="http://host", ALLOWED_HOSTS=["api.example.com"]
+    )
+    def test_relative_urls_get_the_request_or_host_origin(self):
+        request = RequestFactory().get("/", HTTP_HOST="api.example.com")
+        self.assertEqual(
+            media_url(self.media, request),
+            "http://api.example.com/media/media_files/a.png",
+        )
+        self.assertEqual(media_url(self.media), "http://host/media/media_files/a.png")
+
+    @override_settings(MEDIA_BASE_URL="https://cdn.example.com/")
+    def test_base_url_overrides_the_origin(self):
+        request = RequestFactory().get("/")
+        self.assertEqual(
+            media_url(self.media, request),
+            "https://cdn.example.com/media/media_files/a.png",
+        )
+
+
+def use_temporary_media_root(test):
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    settings_override = override_settings(MEDIA_ROOT=media_root)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+class ContentAddressedMediaTest(TestCase):
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def test_identical_uploads_share_a_row_and_a_blob(self):
+        first, created = Media.objects.store(ContentFile(b"PNG", name="a.PNG"), "image")
+        self.assertTrue(created)
+        self.assertRegex(first.file.name, r"^media_files/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+        second, created = Media.objects.store(ContentFile(b"PNG", name="b.png"), "image")
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+
+        media = Media(type="image", file=ContentFile(b"PNG", name="c.png"))
+        with self.assertRaisesMessage(ValidationError, f"media #{first.pk}"):
+            media.full_clean()
+
+    def test_garbage_collection_removes_unused_blobs(self):
+        kept, _ = Media.objects.store(ContentFile(b"kept", name="kept.mp3"), "audio")
+        dropped, _ = Media.objects.store(ContentFile(b"gone", name="gone.mp3"), "audio")
+        icon, _ = Media.objects.store(ContentFile(b"icon", name="icon.png"), "image")
+        image, _ = Media.objects.store(ContentFile(b"image", name="image.png"), "image")
+        category = Category.objects.create(name="Math", icon=icon)
+        Subject.objects.create(name="Algebra", category=category, image=image)
+        path = dropped.file.name
+        dropped.delete()
+
+        self.assertEqual(collect_garbage(min_age=timedelta(days=1)), (0, 0))
+        self.assertEqual(collect_garbage(min_age=timedelta(0)), (0, 1))
+        self.assertFalse(default_storage.exists(path))
+        self.assertTrue(default_storage.exists(kept.file.name))
+
+        self.assertEqual(
+            collect_garbage(min_age=timedelta(days=1), prune_rows=True), (0, 0)
+        )
+        self.assertEqual(
+            collect_garbage(min_age=timedelta(0), prune_rows=True), (1, 1)
+        )
+        self.assertEqual(set(Media.objects.all()), {icon, image})
+        self.assertTrue(default_storage.exists(icon.file.name))
+
+
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        use_temporary_media_root(self)
+
+    def test_variant_is_built_on_first_request(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 500), "red").save(buffer, "PNG")
+        media, _ = Media.objects.store(
+            ContentFile(buffer.getvalue(), name="bg.png"), "image"
+        )
+        request = RequestFactory().get("/")
+        url = variant_url(media, "icon", request)
+        self.assertEqual(url, f"http://testserver/api/common/media/{media.pk}/icon/")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].endswith(".webp"))
+        name = images.variant_name(media, "icon")
+        with default_storage.open(name) as file:
+            self.assertEqual(Image.open(file).size, (128, 64))
+        self.assertEqual(variant_url(media, "icon", request), response["Location"])
+
+    def test_unknown_presets_are_not_found(self):
+        media = Media.objects.create(type="image", file="media_files/a.png")
+        response = self.client.get(f"/api/common/media/{media.pk}/huge/")
+        self.assertEqual(response.status_code, 404)
+
+
+class MediaFileViewTest(TestCase):
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.media, _ = Media.objects.store(
+            ContentFile(bytes(range(100)), name="clip.mp4"), "video"
+        )
+        self.url = "/media/" + self.media.file.name
+
+    def test_ranges_are_streamed_from_the_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(100)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(95, 100)))
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    @override_settings(
+        MEDIA_SENDFILE_BACKEND="x-accel-redirect",
+        MEDIA_ACCEL_REDIRECT_PREFIX="/protected/",
+    )
+    def test_transfer_is_offloaded_to_the_front_server(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/" + self.media.file.name
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_paths_outside_media_root_are_not_found(self):
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/missing.mp4").status_code, 404)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-", 10), (0, 9))
+        self.assertEqual(parse_range("bytes=5-50", 10), (5, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=9-3", 10)
@@ -0,0 +1,116 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from common.cache import redis_client
+
+# Spend one token and store when the bucket is full again, atomically. Returns
+# the seconds to wait, or "0" once the token was spent.
+_SPEND = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local duration = tonumber(ARGV[3])
+local full_at = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+full_at = full_at + interval
+local wait = full_at - now - duration
+if wait > 0 then return tostring(wait) end
+redis.call('SET', KEYS[1], tostring(full_at), 'PX', math.ceil((full_at - now) * 1000))
+return '0'
+"""
+
+# Other backends serialize updates of a bucket with an ``add`` lock.
+LOCK_TIMEOUT = 2
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.005
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket per ``throttle_scope`` of the view and per user or client IP.
+
+    A rate of ``"N/period"`` holds up to N tokens and refills N tokens per
+    period, so a client may burst N requests and is then paced evenly. The
+    bucket is stored as a single timestamp, the moment it will be full again,
+    in the cache alias named by ``THROTTLE_CACHE``. On Redis a token is spent
+    by one Lua script; other backends take a short ``add`` lock on the bucket.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        # The rate depends on the view and is resolved in ``allow_request``.
+        pass
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"No default throttle rate set for '{self.scope}' scope"
+            )
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, "throttle_scope", None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        client = redis_client(settings.THROTTLE_CACHE)
+        if client is not None:
+            self.wait_time = float(
+                client.eval(
+                    _SPEND,
+                    1,
+                    self.cache.make_key(self.key),
+                    self.timer(),
+                    self.duration / self.num_requests,
+                    self.duration,
+                )
+            )
+        else:
+            self.wait_time = self.spend_locked()
+        return self.wait_time <= 0
+
+    def spend_locked(self):
+        lock = f"{self.key}:lock"
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+                try:
+                    return self.spend()
+                finally:
+                    self.cache.delete(lock)
+            time.sleep(LOCK_WAIT)
+        # The bucket is too busy to read: ask for one refill interval.
+        return self.duration / self.num_requests
+
+    def spend(self):
+        now = self.timer()
+        full_at = max(self.cache.get(self.key, now), now)
+        full_at += self.duration / self.num_requests
+        wait = full_at - now - self.duration
+        if wait <= 0:
+            self.cache.set(self.key, full_at, timeout=math.ceil(full_at - now))
+        return wait
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from common.views import MediaVariantView
+
+urlpatterns = [
+    path(
+        "media/<int:pk>/<slug:preset>/",
+        MediaVariantView.as_view(),
+        name="media-variant",
+    ),
+]
@@ -1,3 +1,94 @@
-from django.shortcuts import render
+import os
+import posixpath
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.shortcuts import get_object_or_404, redirect
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+from common import delivery, images
+from common.media import media_url
+from common.models import Media
+
+
+def check_media_access(request, name):
+    """Raise unless ``MEDIA_ACCESS_POLICY`` lets the request read ``name``."""
+    if not import_string(settings.MEDIA_ACCESS_POLICY)(request, name):
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+        raise PermissionDenied()
+
+
+class MediaVariantView(APIView):
+    """
+    Build an image variant on first use and redirect to the stored file.
+
+    The source image goes through ``MEDIA_ACCESS_POLICY`` first, so variants
+    of restricted media are only built and linked for readers of the
+    original.
+    """
+
+    permission_classes = [AllowAny]
+    stateless_auth = True
+    swagger_schema = None
+
+    def get(self, request, pk, preset):
+        if preset not in settings.MEDIA_IMAGE_PRESETS:
+            raise NotFound("Unknown image preset")
+        media = get_object_or_404(Media, pk=pk)
+        check_media_access(request, media.file.name)
+        if not images.supports_variants(media):
+            response = redirect(media_url(media, request))
+        else:
+            try:
+                images.build_variant(media, preset)
+            except (OSError, ValueError):
+                # Unreadable or unsupported image: fall back to the original.
+                response = redirect(media_url(media, request))
+            else:
+                response = redirect(images.variant_url(media, preset, request))
+        patch_cache_control(response, private=True, max_age=60 * 60)
+        return response
+
+
+class MediaFileView(APIView):
+    """
+    Serve a file from ``MEDIA_ROOT`` after ``MEDIA_ACCESS_POLICY`` allows it.
+    Image variants are checked against the media they were built from.
+
+    With ``MEDIA_SENDFILE_BACKEND`` set the transfer is handed to the front
+    server, otherwise the file is streamed with ``Range`` support.
+    """
+
+    permission_classes = [AllowAny]
+    stateless_auth = True
+    swagger_schema = None
+
+    def get(self, request, path):
+        # The policy matches stored names exactly, so only canonical paths are
+        # served; "a//b" or "./a" would otherwise reach a restricted file under
+        # a name the policy does not know.
+        if posixpath.normpath(path) != path:
+            raise NotFound()
+        # Access is decided from the name alone, before the disk is looked at,
+        # so refused callers cannot tell which files exist.
+        source = path
+        if images.is_variant_path(path):
+            media = images.variant_source(path)
+            source = media.file.name if media is not None else None
+        if source is not None:
+            check_media_access(request, source)
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise NotFound()
+        if source is None or not os.path.isfile(full_path):
+            raise NotFound()
+        if settings.MEDIA_SENDFILE_BACKEND:
+            return delivery.offloaded_response(path, full_path)
+        return delivery.streamed_response(request, path, full_path)
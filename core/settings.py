@@ -49,6 +49,7 @@ INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "common.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -158,6 +159,27 @@ MODELTRANSLATION_TRANSLATION_FILES = ("news.translation", "company.translation")
 
 HOST = os.getenv("HOST")
 
+# Origin of media URLs, e.g. a CDN. Defaults to the request's origin.
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", "")
+MEDIA_URL_CACHE_SIZE = 4096
+
+# Bounding boxes of the WebP variants served for image media
+MEDIA_IMAGE_PRESETS = {
+    "icon": (128, 128),
+    "thumb": (320, 320),
+    "card": (720, 720),
+}
+MEDIA_IMAGE_QUALITY = 80
+
+# Media delivery: "x-accel-redirect" (nginx), "x-sendfile" (Apache, lighttpd)
+# or empty to stream files from Django
+MEDIA_SENDFILE_BACKEND = os.getenv("MEDIA_SENDFILE_BACKEND", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+MEDIA_STREAM_CHUNK_SIZE = 256 * 1024
+MEDIA_ACCESS_POLICY = "subject.permissions.can_access_media"
+
 JAZZMIN_SETTINGS = JAZZMIN_SETTINGS
 
 customColorPalette = [
@@ -311,10 +333,38 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
 OTP_CODE_VERIFICATION_TIME = 2
 
+# Queue test submissions and grade them with `manage.py process_submissions`
+ASYNC_TEST_SUBMISSIONS = os.getenv("ASYNC_TEST_SUBMISSIONS") == "True"
+
+# Authenticated users are read from a cache for this many seconds
+AUTH_USER_CACHE_TIMEOUT = 300
+# Build users from token claims on safe requests to views that allow it
+JWT_STATELESS_USERS = os.getenv("JWT_STATELESS_USERS") == "True"
+
+# Responses smaller than this many bytes are not compressed
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", 1024))
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
+
+# Cache alias holding the throttle buckets of ``common.throttling``
+THROTTLE_CACHE = os.getenv("THROTTLE_CACHE", "default")
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        "account.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "common.pagination.KeysetPagination",
+    "PAGE_SIZE": 20,
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "10/min",
+        "register": "5/min",
+        "reset_password": "5/min",
+        "step_test": "10/min",
+    },
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -359,8 +409,8 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
-    "TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainPairSerializer",
-    "TOKEN_REFRESH_SERIALIZER": "rest_framework_simplejwt.serializers.TokenRefreshSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "account.tokens.UserTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "account.tokens.UserTokenRefreshSerializer",
     "TOKEN_VERIFY_SERIALIZER": "rest_framework_simplejwt.serializers.TokenVerifySerializer",
     "TOKEN_BLACKLIST_SERIALIZER": "rest_framework_simplejwt.serializers.TokenBlacklistSerializer",
     "SLIDING_TOKEN_OBTAIN_SERIALIZER": "rest_framework_simplejwt.serializers.TokenObtainSlidingSerializer",
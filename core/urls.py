@@ -7,6 +7,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from common.views import MediaFileView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Snippets API",
@@ -30,6 +32,7 @@ urlpatterns += i18n_patterns(
 urlpatterns += [
     path("api/account/", include("account.urls")),
     path("api/subject/", include("subject.urls")),
+    path("api/common/", include("common.urls")),
     path(
         "swagger/",
         schema_view.with_ui("swagger", cache_timeout=0),
@@ -47,7 +50,13 @@ urlpatterns += [
     path("ckeditor5/", include("django_ckeditor_5.urls")),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/<path:path>",
+        MediaFileView.as_view(),
+        name="media-file",
+    ),
+]
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 if "rosetta" in settings.INSTALLED_APPS:
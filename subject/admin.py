@@ -8,6 +8,7 @@ from .models import (
     Subject,
     TestAnswer,
     TestQuestion,
+    TestSubmission,
     UserStep,
     UserSubject,
     UserTestResult,
@@ -70,3 +71,9 @@ class StepTestAdmin(admin.ModelAdmin):
 @admin.register(Step)
 class StepAdmin(admin.ModelAdmin):
     inlines = [StepFileInlineAdmin]
+
+
+@admin.register(TestSubmission)
+class TestSubmissionAdmin(admin.ModelAdmin):
+    list_display = ("id", "total_result", "status", "created_at", "processed_at")
+    list_filter = ("status",)
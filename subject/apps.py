@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SubjectConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "subject"
+
+    def ready(self):
+        from subject import signals  # noqa: F401
@@ -0,0 +1,39 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from common.cache import VersionedCache
+
+# Serialized responses of the read-only catalog views. One version covers the
+# whole catalog, which changes rarely.
+catalog_cache = VersionedCache("catalog", local_size=512, track_stats=True)
+
+CATALOG_SCOPE = "all"
+
+
+def get_or_build(request, part, builder, params=None):
+    """
+    Serialized data for this request, rebuilt when the catalog changes.
+
+    Entries are keyed on the scheme, host and path, which absolute links in
+    the data are built from, and on the normalized ``params`` the view
+    actually reads, never on the raw query string, so unknown or reordered
+    query parameters share one entry.
+    """
+    params = json.dumps(params or {}, sort_keys=True, cls=DjangoJSONEncoder)
+    key = f"{part}:{request.scheme}:{request.get_host()}:{request.path}:{params}"
+    return catalog_cache.get_or_build(CATALOG_SCOPE, key, builder)
+
+
+def get_version():
+    return catalog_cache.get_version(CATALOG_SCOPE)
+
+
+def bump_version():
+    transaction.on_commit(lambda: catalog_cache.bump(CATALOG_SCOPE))
+
+
+def etag(request, *args, **kwargs):
+    """ETag of every catalog response, read from the catalog version alone."""
+    return f"catalog-{get_version()}"
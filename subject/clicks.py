@@ -0,0 +1,92 @@
+import logging
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from common.cache import incr, redis_client
+from subject import catalog
+from subject.models import Category
+
+logger = logging.getLogger(__name__)
+
+CLICK_KEY = "category-clicks:{}"
+
+# Clicks that could not reach the cache, pushed again on the next click.
+_pending = Counter()
+_pending_lock = threading.Lock()
+
+
+def record_click(category_id):
+    """Count a category click in the cache without touching the database."""
+    with _pending_lock:
+        _pending[category_id] += 1
+        pending = dict(_pending)
+        _pending.clear()
+    for pending_id, count in pending.items():
+        try:
+            incr(CLICK_KEY.format(pending_id), count)
+        except Exception:
+            logger.warning("Could not buffer clicks of category %s", pending_id)
+            with _pending_lock:
+                _pending[pending_id] += count
+
+
+def _take_counts(keys):
+    """
+    Read and reset buffered counters atomically, per key.
+
+    Clicks that arrive afterwards start a new counter for the next flush, and
+    a counter evicted meanwhile is simply skipped.
+    """
+    client = redis_client()
+    if client is not None:
+        pipe = client.pipeline()
+        for key in keys:
+            pipe.getdel(cache.make_key(key))
+        return {
+            category_id: int(count)
+            for category_id, count in zip(keys.values(), pipe.execute())
+            if count
+        }
+    counts = {}
+    for key, count in cache.get_many(keys).items():
+        if not count:
+            continue
+        try:
+            cache.decr(key, count)
+        except ValueError:
+            continue
+        counts[keys[key]] = count
+    return counts
+
+
+def flush_clicks():
+    """
+    Move buffered clicks into ``Category.click_count`` with one UPDATE.
+
+    Counters are taken out of the cache before the UPDATE, so a failed flush
+    can lose a batch of clicks but never count one twice. Returns the number
+    of clicks flushed.
+    """
+    keys = {
+        CLICK_KEY.format(category_id): category_id
+        for category_id in Category.objects.values_list("id", flat=True)
+    }
+    counts = _take_counts(keys)
+    if not counts:
+        return 0
+    Category.objects.filter(pk__in=counts).update(
+        click_count=F("click_count")
+        + Case(
+            *[
+                When(pk=category_id, then=Value(count))
+                for category_id, count in counts.items()
+            ],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+    )
+    catalog.bump_version()
+    return sum(counts.values())
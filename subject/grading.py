@@ -0,0 +1,260 @@
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from common import error_codes
+from subject.models import (
+    TestAnswer,
+    TestQuestion,
+    UserTestResult,
+    UserTotalTestResult,
+)
+from subject.signals import test_finished
+from subject.utils import calculate_test_ball, step_test_cache
+
+
+class QuestionKey(NamedTuple):
+    question_type: str
+    answer_ids: frozenset
+    correct_ids: frozenset
+    ordering: tuple
+
+
+class SubmitScoring:
+    """Scoring used by ``SubmitTestView``: a flat ball for every hit."""
+
+    def question_ball(self, key, step_test):
+        return step_test.ball_for_each_test
+
+    def percentage(self, total_ball, question_count, step_test):
+        return total_ball / (question_count * step_test.ball_for_each_test) * 100
+
+
+class FinishScoring(SubmitScoring):
+    """Scoring used by ``StepTestFinishView``."""
+
+    def question_ball(self, key, step_test):
+        return calculate_test_ball(key.question_type, step_test.ball_for_each_test)
+
+    def percentage(self, total_ball, question_count, step_test):
+        return total_ball * 100 // question_count
+
+
+SCORING_RULES = {
+    "submit": SubmitScoring(),
+    "finish": FinishScoring(),
+}
+
+
+def attempt_rule(total_result, scoring):
+    """
+    Scoring rule of an attempt.
+
+    The first endpoint that records answers for the attempt fixes its rule, so
+    autosaved answers and the final total are always scored alike.
+    """
+    if not total_result.scoring:
+        total_result.scoring = scoring
+        total_result.save(update_fields=["scoring"])
+    return SCORING_RULES[total_result.scoring]
+
+
+@dataclass
+class GradingOutcome:
+    ball: float
+    percentage: float
+    question_count: int
+    correct_answers_count: int
+    incorrect_answers_count: int
+
+
+def get_answer_keys(step_test_id):
+    """Answer keys of every question of a step test, cached per content version."""
+    return step_test_cache.get_or_build(
+        step_test_id, "answer-keys", lambda: load_answer_keys(step_test_id)
+    )
+
+
+def load_answer_keys(step_test_id):
+    """Answer keys of every question of a step test, in two queries."""
+    questions = TestQuestion.objects.filter(steptest_id=step_test_id).values_list(
+        "id", "question_type"
+    )
+    answers = {question_id: [] for question_id, _ in questions}
+    for row in TestAnswer.objects.filter(test_quetion_id__in=answers).values_list(
+        "test_quetion_id", "id", "is_correct", "order"
+    ):
+        answers[row[0]].append(row[1:])
+    return {
+        question_id: build_question_key(question_type, answers[question_id])
+        for question_id, question_type in questions
+    }
+
+
+def build_question_key(question_type, answers):
+    """``answers`` is an iterable of ``(id, is_correct, order)`` tuples."""
+    answers = sorted(answers)
+    ordered = sorted(
+        (order, answer_id) for answer_id, _, order in answers if order is not None
+    )
+    return QuestionKey(
+        question_type=question_type,
+        answer_ids=frozenset(answer_id for answer_id, _, _ in answers),
+        correct_ids=frozenset(
+            answer_id for answer_id, is_correct, _ in answers if is_correct
+        ),
+        ordering=tuple(answer_id for _, answer_id in ordered),
+    )
+
+
+def score_question(key, answer_ids):
+    """
+    Score one question in memory.
+
+    Returns the answer ids to record for the question and the number of hits
+    that earn a ball.
+    """
+    chosen = [
+        answer_id for answer_id in dict.fromkeys(answer_ids) if answer_id in key.answer_ids
+    ]
+    if key.question_type == TestQuestion.QuestionType.MULTIPLE:
+        return chosen, sum(1 for answer_id in chosen if answer_id in key.correct_ids)
+    if key.question_type == TestQuestion.QuestionType.ORDERING:
+        return chosen, int(bool(chosen) and tuple(chosen) == key.ordering)
+    chosen = chosen[:1]
+    return chosen, int(bool(chosen) and chosen[0] in key.correct_ids)
+
+
+def check_submission(total_result, questions):
+    """
+    Deduplicate submitted questions and check they belong to the attempt.
+
+    Questions must be part of the paper sampled when the attempt started.
+    Attempts started before papers were stored only check step test
+    membership. Returns the ``{question_id: answer_ids}`` map and the step
+    test's answer keys.
+    """
+    submitted = {}
+    for qst in questions:
+        submitted.setdefault(qst["question_id"], qst["answer_ids"])
+    keys = get_answer_keys(total_result.step_test_id)
+    if not keys.keys() >= submitted.keys():
+        raise ValidationError(
+            {"questions": error_codes.TEST_QUESTION_NOT_IN_STEP_TEST}
+        )
+    paper = total_result.question_ids
+    if paper and not set(paper) >= submitted.keys():
+        raise ValidationError({"questions": error_codes.TEST_QUESTION_NOT_IN_PAPER})
+    return submitted, keys
+
+
+def grade_attempt(total_result, questions, rule):
+    """
+    Grade a submitted attempt and close it.
+
+    ``total_result`` must be locked by the caller inside a transaction and have
+    ``step_test`` loaded. Answers saved earlier during the test are kept unless
+    the submission answers the same question again.
+    """
+    submitted, keys = check_submission(total_result, questions)
+    record_answers(total_result, submitted, keys, rule)
+    return close_attempt(total_result, rule)
+
+
+def record_answers(total_result, submitted, keys, rule):
+    """
+    Score answers and store them on a running attempt, replacing earlier ones.
+
+    Answer keys come from the step test's cached key map and the rows are
+    written with bulk inserts, so the number of queries does not depend on the
+    number of questions.
+    """
+    if not submitted:
+        return
+    step_test = total_result.step_test
+    UserTestResult.objects.filter(
+        total_result=total_result, test_question_id__in=submitted
+    ).delete()
+
+    results = []
+    chosen_answers = []
+    for question_id, answer_ids in submitted.items():
+        key = keys[question_id]
+        chosen, hits = score_question(key, answer_ids)
+        correct = sum(1 for answer_id in chosen if answer_id in key.correct_ids)
+        results.append(
+            UserTestResult(
+                user_id=total_result.user_id,
+                test_question_id=question_id,
+                total_result=total_result,
+                ball=hits * rule.question_ball(key, step_test),
+                correct_answers=correct,
+                incorrect_answers=len(chosen) - correct,
+            )
+        )
+        chosen_answers.append(chosen)
+
+    UserTestResult.objects.bulk_create(results)
+    AnswerThrough = UserTestResult.test_answers.through
+    AnswerThrough.objects.bulk_create(
+        AnswerThrough(usertestresult_id=result.pk, testanswer_id=answer_id)
+        for result, chosen in zip(results, chosen_answers)
+        for answer_id in chosen
+    )
+    ResultThrough = UserTotalTestResult.user_test_results.through
+    ResultThrough.objects.bulk_create(
+        ResultThrough(usertotaltestresult_id=total_result.pk, usertestresult_id=result.pk)
+        for result in results
+    )
+
+
+def close_attempt(total_result, rule):
+    """
+    Add up the stored per-question scores of an attempt and finish it.
+
+    The percentage is taken over every question of the sampled paper, so
+    unanswered questions count as missed.
+    """
+    totals = total_result.total_results.aggregate(
+        ball=Sum("ball"),
+        question_count=Count("id"),
+        correct_questions=Count("id", filter=Q(ball__gt=0)),
+        correct_answers=Sum("correct_answers"),
+        incorrect_answers=Sum("incorrect_answers"),
+    )
+    total_ball = totals["ball"] or 0
+    # Only attempts started before papers were stored can hold answers to
+    # questions outside the step test's sample size.
+    question_count = len(total_result.question_ids) or max(
+        total_result.step_test.question_count, totals["question_count"]
+    )
+
+    total_result.ball = total_ball
+    total_result.percentage = (
+        rule.percentage(total_ball, question_count, total_result.step_test)
+        if question_count
+        else 0
+    )
+    total_result.correct_answers = totals["correct_questions"]
+    total_result.finished = True
+    total_result.finished_at = timezone.now()
+    total_result.save(
+        update_fields=[
+            "ball",
+            "percentage",
+            "correct_answers",
+            "finished",
+            "finished_at",
+        ]
+    )
+    test_finished.send(sender=UserTotalTestResult, total_result=total_result)
+    return GradingOutcome(
+        ball=total_ball,
+        percentage=total_result.percentage,
+        question_count=question_count,
+        correct_answers_count=totals["correct_answers"] or 0,
+        incorrect_answers_count=totals["incorrect_answers"] or 0,
+    )
@@ -0,0 +1,267 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from common.cache import redis_client
+from subject.models import LeaderboardEntry, UserTotalTestResult
+
+# The step test board ranks a user's best ball on that test. The subject board
+# ranks the sum of the user's best balls over the subject's step tests.
+RANKING = ("-ball", "achieved_at", "id")
+
+# When the cache is Redis every board is mirrored into a sorted set scored by
+# ball, so a rank is one ZREVRANK. Members are ordered like RANKING among equal
+# balls under ZREVRANK, and a hash maps each user to their current member.
+RANK_KEY = "leaderboard-ranks:{}:{}"
+RANK_TIMEOUT = 24 * 60 * 60
+_MAX_TIME = 10**17 - 1
+_MAX_ID = 10**19 - 1
+
+# Replace the member of a user on an existing board unless the board already
+# holds a higher ball for them.
+_SET_RANK = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+local old = redis.call('HGET', KEYS[2], ARGV[1])
+if old then
+    local score = redis.call('ZSCORE', KEYS[1], old)
+    if score and tonumber(score) > tonumber(ARGV[2]) then return 0 end
+    redis.call('ZREM', KEYS[1], old)
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+return 1
+"""
+
+
+def _rank_keys(scope, scope_id):
+    key = cache.make_key(RANK_KEY.format(scope, scope_id))
+    return key, f"{key}:members"
+
+
+def _rank_member(entry):
+    achieved_at = int(entry.achieved_at.timestamp() * 1_000_000)
+    return f"{_MAX_TIME - achieved_at:017d}:{_MAX_ID - entry.id:019d}"
+
+
+def _index_entry(scope, entry):
+    client = redis_client()
+    if client is None:
+        return
+    client.eval(
+        _SET_RANK,
+        2,
+        *_rank_keys(scope, getattr(entry, f"{scope}_id")),
+        entry.user_id,
+        entry.ball,
+        _rank_member(entry),
+    )
+
+
+def _load_board(client, scope, scope_id, chunk_size=1000):
+    """Fill a board's sorted set from the database and swap it in."""
+    key, members_key = _rank_keys(scope, scope_id)
+    loading = f"{key}:loading:{uuid.uuid4().hex}"
+    entries = LeaderboardEntry.objects.filter(**{f"{scope}_id": scope_id}).only(
+        "id", "user_id", "ball", "achieved_at"
+    )
+    pipe = client.pipeline()
+    loaded = 0
+    for entry in entries.iterator(chunk_size=chunk_size):
+        member = _rank_member(entry)
+        pipe.zadd(loading, {member: entry.ball})
+        pipe.hset(f"{loading}:members", entry.user_id, member)
+        loaded += 1
+        if loaded % chunk_size == 0:
+            pipe.execute()
+    if not loaded:
+        return
+    pipe.expire(loading, RANK_TIMEOUT)
+    pipe.expire(f"{loading}:members", RANK_TIMEOUT)
+    pipe.rename(loading, key)
+    pipe.rename(f"{loading}:members", members_key)
+    pipe.execute()
+
+
+def indexed_rank(scope, scope_id, entry):
+    """
+    Rank of ``entry`` from the board's sorted set, loading it on first use.
+
+    Returns ``None`` when the cache is not Redis or the set does not hold the
+    entry as stored yet.
+    """
+    client = redis_client()
+    if client is None:
+        return None
+    key, _ = _rank_keys(scope, scope_id)
+    if not client.exists(key):
+        _load_board(client, scope, scope_id)
+    position = client.zrevrank(key, _rank_member(entry))
+    return None if position is None else position + 1
+
+
+def record_attempt(total_result):
+    """Fold a finished attempt into the step test and subject boards."""
+    if total_result.ball is None:
+        return
+    user_id = total_result.user_id
+    achieved_at = total_result.finished_at or timezone.now()
+    updated = LeaderboardEntry.objects.filter(
+        step_test_id=total_result.step_test_id,
+        user_id=user_id,
+        ball__lt=total_result.ball,
+    ).update(ball=total_result.ball, achieved_at=achieved_at)
+    if not updated:
+        _, created = LeaderboardEntry.objects.get_or_create(
+            step_test_id=total_result.step_test_id,
+            user_id=user_id,
+            defaults={"ball": total_result.ball, "achieved_at": achieved_at},
+        )
+        if not created:
+            return
+
+    subject_id = total_result.step_test.step.subject_id
+    subject_ball = LeaderboardEntry.objects.filter(
+        step_test__step__subject_id=subject_id, user_id=user_id
+    ).aggregate(ball=Sum("ball"))["ball"]
+    subject_entry, _ = LeaderboardEntry.objects.update_or_create(
+        subject_id=subject_id,
+        user_id=user_id,
+        defaults={"ball": subject_ball, "achieved_at": achieved_at},
+    )
+    if redis_client() is not None:
+        step_test_entry = LeaderboardEntry.objects.get(
+            step_test_id=total_result.step_test_id, user_id=user_id
+        )
+        transaction.on_commit(lambda: _index_entry("step_test", step_test_entry))
+        transaction.on_commit(lambda: _index_entry("subject", subject_entry))
+
+
+def top(scope, scope_id, limit=10):
+    """Best ``limit`` entries of a board, served by the board's index."""
+    return list(
+        LeaderboardEntry.objects.filter(**{f"{scope}_id": scope_id})
+        .select_related("user")
+        .order_by(*RANKING)[:limit]
+    )
+
+
+def _ahead_of(entry):
+    return (
+        Q(ball__gt=entry.ball)
+        | Q(ball=entry.ball, achieved_at__lt=entry.achieved_at)
+        | Q(ball=entry.ball, achieved_at=entry.achieved_at, id__lt=entry.id)
+    )
+
+
+def _behind(entry):
+    return (
+        Q(ball__lt=entry.ball)
+        | Q(ball=entry.ball, achieved_at__gt=entry.achieved_at)
+        | Q(ball=entry.ball, achieved_at=entry.achieved_at, id__gt=entry.id)
+    )
+
+
+def standing(scope, scope_id, user, neighbors=3):
+    """
+    Rank of ``user`` on a board and up to ``neighbors`` entries on each side.
+
+    Returns ``None`` when the user has no entry on the board.
+    """
+    board = LeaderboardEntry.objects.filter(**{f"{scope}_id": scope_id})
+    entry = board.filter(user=user).first()
+    if entry is None:
+        return None
+    ahead = board.filter(_ahead_of(entry))
+    rank = indexed_rank(scope, scope_id, entry) or ahead.count() + 1
+    above = list(
+        ahead.select_related("user").order_by("ball", "-achieved_at", "-id")[:neighbors]
+    )
+    above.reverse()
+    below = list(
+        board.filter(_behind(entry))
+        .select_related("user")
+        .order_by(*RANKING)[:neighbors]
+    )
+    entry.user = user
+    return {
+        "rank": rank,
+        "entry": entry,
+        "above": above,
+        "below": below,
+    }
+
+
+def rebuild(chunk_size=1000):
+    """
+    Recreate every board from finished attempts.
+
+    A step test entry is dated by the first attempt that reached the best
+    ball, as ``record_attempt`` does, so ties keep their order.
+    """
+    LeaderboardEntry.objects.all().delete()
+    now = timezone.now()
+    results = (
+        UserTotalTestResult.objects.filter(finished=True, ball__isnull=False)
+        .order_by(
+            "step_test_id",
+            "user_id",
+            "-ball",
+            F("finished_at").asc(nulls_last=True),
+            "id",
+        )
+        .values_list("step_test_id", "user_id", "ball", "finished_at")
+    )
+    batch = []
+    board_user = None
+    for step_test_id, user_id, ball, finished_at in results.iterator(
+        chunk_size=chunk_size
+    ):
+        if (step_test_id, user_id) == board_user:
+            continue
+        board_user = (step_test_id, user_id)
+        batch.append(
+            LeaderboardEntry(
+                step_test_id=step_test_id,
+                user_id=user_id,
+                ball=ball,
+                achieved_at=finished_at or now,
+            )
+        )
+        if len(batch) >= chunk_size:
+            LeaderboardEntry.objects.bulk_create(batch)
+            batch = []
+    LeaderboardEntry.objects.bulk_create(batch)
+
+    subject_totals = (
+        LeaderboardEntry.objects.filter(step_test__isnull=False)
+        .values("step_test__step__subject_id", "user_id")
+        .annotate(ball=Sum("ball"), achieved_at=Max("achieved_at"))
+        .order_by("step_test__step__subject_id", "user_id")
+    )
+    batch = []
+    for row in subject_totals.iterator(chunk_size=chunk_size):
+        batch.append(
+            LeaderboardEntry(
+                subject_id=row["step_test__step__subject_id"],
+                user_id=row["user_id"],
+                ball=row["ball"],
+                achieved_at=row["achieved_at"],
+            )
+        )
+        if len(batch) >= chunk_size:
+            LeaderboardEntry.objects.bulk_create(batch)
+            batch = []
+    LeaderboardEntry.objects.bulk_create(batch)
+    # Rank sets reload from the table, so drop them only once the new rows
+    # are committed; a reload in between would index the old rows again.
+    transaction.on_commit(_drop_rank_sets)
+
+
+def _drop_rank_sets():
+    client = redis_client()
+    if client is not None:
+        for key in client.scan_iter(match=cache.make_key(RANK_KEY.format("*", "*"))):
+            client.delete(key)
@@ -0,0 +1,88 @@
+import io
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from subject import question_bank
+from subject.models import Category, Step, StepTest, Subject, TestQuestion
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure question bank import and export throughput on a generated "
+        "bank. Everything is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=10000)
+        parser.add_argument("--answers", type=int, default=4)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        category = Category.objects.create(name=f"benchmark-{time.time_ns()}")
+        subject = Subject.objects.create(name="Benchmark", category=category)
+        step = Step.objects.create(
+            title="Benchmark", order=1, subject=subject, description=""
+        )
+        step_test = StepTest.objects.create(
+            step=step,
+            ball_for_each_test=1,
+            question_count=10,
+            test_type=StepTest.TestTypes.MIDTERM,
+            time_for_test=timedelta(minutes=30),
+        )
+        lines = io.StringIO()
+        for number in range(options["questions"]):
+            lines.write(
+                '{"steptest": %d, "question_type": "single", "level": "easy", '
+                '"question": "<p>Question %d</p>", "answers": [%s]}\n'
+                % (
+                    step_test.id,
+                    number,
+                    ", ".join(
+                        '{"answer": "<p>Answer %d</p>", "is_correct": %s, "order": %d}'
+                        % (order, "true" if order == 1 else "false", order)
+                        for order in range(1, options["answers"] + 1)
+                    ),
+                )
+            )
+        lines.seek(0)
+
+        started = time.perf_counter()
+        imported = question_bank.import_questions(
+            question_bank.read_records(lines), options["chunk_size"]
+        )
+        import_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        exported_bytes = sum(
+            len(line.encode())
+            for line in question_bank.export_questions(
+                TestQuestion.objects.filter(steptest=step_test),
+                chunk_size=options["chunk_size"],
+            )
+        )
+        export_time = time.perf_counter() - started
+
+        self.stdout.write(
+            f"import: {imported} questions in {import_time:.2f}s "
+            f"({imported / import_time:.0f} questions/s)"
+        )
+        self.stdout.write(
+            f"export: {exported_bytes} bytes in {export_time:.2f}s "
+            f"({imported / export_time:.0f} questions/s)"
+        )
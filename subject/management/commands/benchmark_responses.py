@@ -0,0 +1,116 @@
+import gzip
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from common import renderers
+from common.middleware import brotli
+from common.renderers import FastJSONRenderer
+
+QUESTION_HTML = (
+    '<p style="text-align:justify;">Question {number}. Read the passage and '
+    "choose the <strong>correct</strong> statement about the <em>table</em> "
+    "below.</p>"
+    '<figure class="table"><table><tbody>'
+    "<tr><td>Year</td><td>Value</td><td>Change</td></tr>"
+    "<tr><td>2021</td><td>&nbsp;1 250</td><td>+4.5%</td></tr>"
+    "<tr><td>2022</td><td>&nbsp;1 310</td><td>+4.8%</td></tr>"
+    "</tbody></table></figure>"
+)
+ANSWER_HTML = (
+    '<p><span style="color:hsl(0,0%,0%);">Answer {number}: option text</span></p>'
+)
+
+
+def exam_paper(questions, answers):
+    """A payload shaped like the ``StartStepTestView`` response."""
+    return {
+        "result_id": 1,
+        "questions": [
+            {
+                "id": number,
+                "question_type": "single",
+                "question": QUESTION_HTML.format(number=number),
+                "test_answers": [
+                    {
+                        "id": number * answers + order,
+                        "answer": ANSWER_HTML.format(number=order),
+                    }
+                    for order in range(answers)
+                ],
+            }
+            for number in range(questions)
+        ],
+    }
+
+
+def exam_results(questions, answers):
+    """A payload shaped like the ``GetTestResultsView`` response."""
+    return [
+        {
+            "id": 1,
+            "step_test": 1,
+            "user": 1,
+            "ball": questions * 2.0,
+            "correct_answers": questions,
+            "user_test_results": [
+                {
+                    "id": number,
+                    "test_question": str(number),
+                    "test_answers": [
+                        {"id": number * answers, "answer": ANSWER_HTML.format(number=0)}
+                    ],
+                }
+                for number in range(questions)
+            ],
+            "finished": True,
+            "percentage": 100,
+            "status": "finished",
+        }
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON rendering time and bytes on the wire for generated exam "
+        "payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=50)
+        parser.add_argument("--answers", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write("orjson is not installed; the fast renderer falls back")
+        payloads = {
+            "paper": exam_paper(options["questions"], options["answers"]),
+            "results": exam_results(options["questions"], options["answers"]),
+        }
+        for name, payload in payloads.items():
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    body = renderer.render(payload)
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                self.stdout.write(
+                    f"{name} {type(renderer).__name__}: {len(body)} bytes, "
+                    f"{elapsed * 1000:.3f} ms"
+                )
+            self.report_compression(name, body)
+
+    def report_compression(self, name, body):
+        started = time.perf_counter()
+        size = len(gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{name} gzip: {size} bytes, {elapsed * 1000:.3f} ms")
+        if brotli is None:
+            self.stdout.write(f"{name} br: brotli is not installed")
+            return
+        started = time.perf_counter()
+        size = len(brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{name} br: {size} bytes, {elapsed * 1000:.3f} ms")
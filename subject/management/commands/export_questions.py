@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from subject import question_bank
+from subject.models import TestQuestion
+
+
+class Command(BaseCommand):
+    help = "Stream a question bank out as JSONL or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--steptest", type=int)
+        parser.add_argument(
+            "--format", choices=question_bank.FORMATS, default="jsonl"
+        )
+        parser.add_argument("--output", help="File to write to instead of stdout")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        questions = TestQuestion.objects.all()
+        if options["steptest"]:
+            questions = questions.filter(steptest=options["steptest"])
+        lines = question_bank.export_questions(
+            questions, options["format"], options["chunk_size"]
+        )
+        if not options["output"]:
+            sys.stdout.writelines(lines)
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as output:
+            output.writelines(lines)
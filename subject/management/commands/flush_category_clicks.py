@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from subject.clicks import flush_clicks
+
+
+class Command(BaseCommand):
+    help = "Write category clicks buffered in the cache to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep flushing every INTERVAL seconds instead of exiting",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_clicks()
+            self.stdout.write(f"Flushed {flushed} clicks")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from subject import question_bank
+
+
+class Command(BaseCommand):
+    help = "Import a JSONL or CSV question bank with chunked bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=question_bank.FORMATS, default="jsonl"
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], "rb") as upload:
+            records = question_bank.read_records(
+                question_bank.text_lines(upload), options["format"]
+            )
+            try:
+                imported = question_bank.import_questions(
+                    records, options["chunk_size"]
+                )
+            except ValidationError as e:
+                raise CommandError(e.detail)
+        self.stdout.write(f"Imported {imported} questions")
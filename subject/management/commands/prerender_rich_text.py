@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from subject.utils import prerender_rich_text
+
+
+class Command(BaseCommand):
+    help = "Store sanitized, minified HTML and plain text of rich-text fields"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        processed = prerender_rich_text(options["batch_size"])
+        self.stdout.write(f"Pre-rendered {processed} rows")
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from subject.submissions import SubmissionWorkerPool, process_submissions
+
+
+class Command(BaseCommand):
+    help = "Grade test submissions queued in asynchronous mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            total = 0
+            while processed := process_submissions(options["batch_size"]):
+                total += processed
+            self.stdout.write(f"Processed {total} submissions")
+            return
+
+        pool = SubmissionWorkerPool(
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            interval=options["interval"],
+        )
+        pool.start()
+        self.stdout.write(f"Started {options['workers']} submission workers")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pool.stop()
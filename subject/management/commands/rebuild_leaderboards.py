@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from subject import leaderboards
+
+
+class Command(BaseCommand):
+    help = "Rebuild step test and subject leaderboards from finished attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            leaderboards.rebuild(options["chunk_size"])
+        self.stdout.write("Leaderboards rebuilt")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from subject import progress
+
+
+class Command(BaseCommand):
+    help = "Rebuild unlocked and finished steps from passing attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = progress.rebuild(options["chunk_size"])
+        self.stdout.write(f"Rebuilt step progress of {processed} started subjects")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from subject import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild user and user-subject score rollups from finished attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = rollups.reconcile(options["chunk_size"])
+        self.stdout.write(f"Reconciled score rollups of {processed} users")
@@ -8,6 +8,22 @@ from common.models import Media
 class Category(models.Model):
     name = models.CharField(verbose_name="Name", max_length=100, unique=True)
     click_count = models.PositiveIntegerField(verbose_name="Click Count", default=0)
+    bg_image = models.ForeignKey(
+        verbose_name="Background image",
+        to=Media,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    icon = models.ForeignKey(
+        verbose_name="Icon",
+        to=Media,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
     def __str__(self) -> str:
         return self.name
@@ -15,6 +31,9 @@ class Category(models.Model):
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categorys"
+        indexes = [
+            models.Index(fields=["-click_count", "id"], name="category_clicks_idx")
+        ]
 
 
 class Subject(models.Model):
@@ -25,6 +44,14 @@ class Subject(models.Model):
         on_delete=models.CASCADE,
         related_name="subjects",
     )
+    image = models.ForeignKey(
+        verbose_name="Image",
+        to=Media,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
     def clean(self):
         subject_count = Subject.objects.filter(category=self.category).count()
@@ -49,8 +76,14 @@ class UserSubject(models.Model):
     user = models.ForeignKey(
         verbose_name="User", to="account.User", on_delete=models.CASCADE
     )
-    total_test_ball = models.PositiveIntegerField(
-        verbose_name="Total test ball", default=0
+    total_test_ball = models.FloatField(verbose_name="Total test ball", default=0)
+    attempts_count = models.PositiveIntegerField(
+        verbose_name="Attempts count", default=0
+    )
+    best_ball = models.FloatField(verbose_name="Best ball", null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    unlocked_order = models.PositiveIntegerField(
+        verbose_name="Unlocked step order", default=1
     )
     started_time = models.DateTimeField(auto_now_add=True)
     started = models.BooleanField(default=False)
@@ -75,6 +108,8 @@ class Step(models.Model):
         related_name="steps",
     )
     description = CKEditor5Field("Description")
+    description_rendered = models.BinaryField(editable=False, null=True)
+    description_text = models.TextField(editable=False, blank=True, default="")
 
     def __str__(self) -> str:
         return self.title
@@ -147,6 +182,8 @@ class TestQuestion(models.Model):
         verbose_name="Question type", max_length=30, choices=QuestionType.choices
     )
     question = CKEditor5Field("Question", config_name="extends")
+    question_rendered = models.BinaryField(editable=False, null=True)
+    question_text = models.TextField(editable=False, blank=True, default="")
     level = models.CharField(
         max_length=10, choices=QuestionLevel.choices, default=QuestionLevel.EASY
     )
@@ -167,6 +204,8 @@ class TestAnswer(models.Model):
         related_name="test_answers",
     )
     answer = CKEditor5Field("Answer", config_name="extends")
+    answer_rendered = models.BinaryField(editable=False, null=True)
+    answer_text = models.TextField(editable=False, blank=True, default="")
     is_correct = models.BooleanField(verbose_name="Is correct")
     order = models.PositiveIntegerField("Order", null=True, blank=True)
 
@@ -189,6 +228,13 @@ class UserTestResult(models.Model):
     user = models.ForeignKey(
         verbose_name="Users", to="account.User", on_delete=models.CASCADE
     )
+    ball = models.FloatField(verbose_name="Ball", default=0)
+    correct_answers = models.PositiveSmallIntegerField(
+        verbose_name="Chosen correct answers", default=0
+    )
+    incorrect_answers = models.PositiveSmallIntegerField(
+        verbose_name="Chosen incorrect answers", default=0
+    )
 
     def __str__(self) -> str:
         return f"{self.pk} - {self.user.username}"
@@ -196,6 +242,7 @@ class UserTestResult(models.Model):
     class Meta:
         verbose_name = "Test result"
         verbose_name_plural = "Test results"
+        unique_together = "total_result", "test_question"
 
 
 class UserTotalTestResult(models.Model):
@@ -213,7 +260,12 @@ class UserTotalTestResult(models.Model):
         verbose_name="Test Results", to=UserTestResult, related_name="testresults"
     )
     finished = models.BooleanField(default=False)
+    finished_at = models.DateTimeField(null=True, blank=True)
     percentage = models.IntegerField(null=True, blank=True)
+    question_ids = models.JSONField(
+        verbose_name="Questions in the paper", default=list, blank=True
+    )
+    scoring = models.CharField(verbose_name="Scoring", max_length=30, blank=True)
 
     def __str__(self) -> str:
         return f"{self.pk} - {self.user.username}"
@@ -223,6 +275,114 @@ class UserTotalTestResult(models.Model):
         verbose_name_plural = "Total test results"
 
 
+class TestSubmission(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        FINISHED = "finished"
+        FAILED = "failed"
+
+    total_result = models.OneToOneField(
+        verbose_name="Total test result",
+        to=UserTotalTestResult,
+        on_delete=models.CASCADE,
+        related_name="submission",
+    )
+    scoring = models.CharField(verbose_name="Scoring", max_length=30)
+    questions = models.JSONField(verbose_name="Questions")
+    status = models.CharField(
+        verbose_name="Status",
+        max_length=30,
+        choices=Status.choices,
+        default=Status.PENDING,
+        db_index=True,
+    )
+    error = models.TextField(verbose_name="Error", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.pk} - {self.status}"
+
+    class Meta:
+        verbose_name = "Test submission"
+        verbose_name_plural = "Test submissions"
+
+
+class UserScoreRollup(models.Model):
+    user = models.OneToOneField(
+        verbose_name="User",
+        to="account.User",
+        on_delete=models.CASCADE,
+        related_name="score_rollup",
+    )
+    total_ball = models.FloatField(verbose_name="Total ball", default=0)
+    attempts_count = models.PositiveIntegerField(
+        verbose_name="Attempts count", default=0
+    )
+    best_ball = models.FloatField(verbose_name="Best ball", null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.pk} - {self.total_ball}"
+
+    class Meta:
+        verbose_name = "User's score rollup"
+        verbose_name_plural = "User's score rollups"
+
+
+class LeaderboardEntry(models.Model):
+    step_test = models.ForeignKey(
+        verbose_name="Step test",
+        to=StepTest,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="leaderboard_entries",
+    )
+    subject = models.ForeignKey(
+        verbose_name="Subject",
+        to=Subject,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="leaderboard_entries",
+    )
+    user = models.ForeignKey(
+        verbose_name="User", to="account.User", on_delete=models.CASCADE
+    )
+    ball = models.FloatField(verbose_name="Best ball")
+    achieved_at = models.DateTimeField(verbose_name="Achieved at")
+
+    def __str__(self) -> str:
+        return f"{self.pk} - {self.ball}"
+
+    class Meta:
+        verbose_name = "Leaderboard entry"
+        verbose_name_plural = "Leaderboard entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["step_test", "user"],
+                condition=models.Q(step_test__isnull=False),
+                name="unique_step_test_leaderboard_user",
+            ),
+            models.UniqueConstraint(
+                fields=["subject", "user"],
+                condition=models.Q(subject__isnull=False),
+                name="unique_subject_leaderboard_user",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["step_test", "-ball", "achieved_at", "id"],
+                name="step_test_leaderboard_idx",
+            ),
+            models.Index(
+                fields=["subject", "-ball", "achieved_at", "id"],
+                name="subject_leaderboard_idx",
+            ),
+        ]
+
+
 class UserStep(models.Model):
     user = models.ForeignKey(
         "account.User", on_delete=models.CASCADE, related_name="user_steps"
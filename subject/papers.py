@@ -0,0 +1,39 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from subject.models import TestQuestion
+from subject.serializers import StepTestQuestionTestSerializer
+from subject.utils import step_test_cache
+
+
+def get_paper_snapshot(step_test_id):
+    """Pre-serialized questions of a step test, rebuilt when its content changes."""
+    return step_test_cache.get_or_build(
+        step_test_id, "paper", lambda: build_paper_snapshot(step_test_id)
+    )
+
+
+def build_paper_snapshot(step_test_id):
+    """Map every question id of a step test to its JSON encoded payload."""
+    questions = TestQuestion.objects.filter(steptest_id=step_test_id).prefetch_related(
+        "test_answers"
+    )
+    return {
+        question.id: json.dumps(
+            StepTestQuestionTestSerializer(question).data,
+            cls=JSONEncoder,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode()
+        for question in questions
+    }
+
+
+def render_paper(result_id, step_test_id, question_ids):
+    """JSON body of a started test, assembled from the snapshot without DRF."""
+    snapshot = get_paper_snapshot(step_test_id)
+    questions = b",".join(
+        snapshot[question_id] for question_id in question_ids if question_id in snapshot
+    )
+    return b'{"result_id":%d,"questions":[%s]}' % (result_id, questions)
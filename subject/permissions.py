@@ -0,0 +1,50 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.permissions import BasePermission
+
+from account.models import User
+from subject.models import StepFile, UserSubject
+
+
+class IsTeacher(BasePermission):
+    """Teachers and staff may manage question banks."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user
+            and user.is_authenticated
+            and (user.is_staff or user.role == User.RoleType.TEACHER)
+        )
+
+
+def can_access_media(request, name):
+    """
+    Files of steps are limited to students who unlocked the step and to
+    staff. Every other media file is public.
+    """
+    steps = set(
+        StepFile.objects.filter(file__file=name).values_list(
+            "step__subject_id", "step__order"
+        )
+    )
+    if not steps:
+        return True
+    user = request.user
+    if not (user and user.is_authenticated):
+        return False
+    if user.is_staff:
+        return True
+    return UserSubject.objects.filter(
+        reduce(
+            or_,
+            (
+                Q(subject_id=subject_id, unlocked_order__gte=order)
+                for subject_id, order in steps
+            ),
+        ),
+        user=user,
+        started=True,
+    ).exists()
@@ -0,0 +1,171 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from subject.models import Step, UserStep, UserSubject, UserTotalTestResult
+
+# A step is unlocked once the previous step's test was passed with this ball.
+PASSING_BALL = 60
+
+PERCENTAGES_KEY = "step-percentages:{}:{}"
+PERCENTAGES_TIMEOUT = 60 * 60 * 24
+
+
+def _unlock(user_id, subject_id, order):
+    UserStep.objects.bulk_create(
+        [
+            UserStep(user_id=user_id, step_id=step_id)
+            for step_id in Step.objects.filter(
+                subject_id=subject_id, order=order
+            ).values_list("id", flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def start_subject(user_subject):
+    """Unlock the first steps of a freshly started subject."""
+    _unlock(user_subject.user_id, user_subject.subject_id, user_subject.unlocked_order)
+
+
+def record_attempt(total_result):
+    """
+    Drop the cached step percentages of the attempt's subject, then finish the
+    attempted step and unlock the next one on a passing ball.
+    """
+    step = total_result.step_test.step
+    key = PERCENTAGES_KEY.format(total_result.user_id, step.subject_id)
+    transaction.on_commit(lambda: cache.delete(key))
+    if total_result.ball is None or total_result.ball < PASSING_BALL:
+        return
+    UserStep.objects.update_or_create(
+        user_id=total_result.user_id,
+        step_id=step.id,
+        defaults={
+            "finished": True,
+            "finished_at": total_result.finished_at or timezone.now(),
+        },
+    )
+    unlocked = UserSubject.objects.filter(
+        user_id=total_result.user_id,
+        subject_id=step.subject_id,
+        unlocked_order__lte=step.order,
+    ).update(unlocked_order=step.order + 1)
+    if unlocked:
+        _unlock(total_result.user_id, step.subject_id, step.order + 1)
+
+
+def step_access(user, step_id):
+    """
+    ``(order, unlocked_order)`` of a step for ``user``, in one query.
+
+    ``unlocked_order`` is the highest step order the user may open in the
+    step's subject, read from the ``(user, subject)`` unique index, or
+    ``None`` when the subject was not started. Returns ``None`` when there is
+    no such step.
+    """
+    unlocked = UserSubject.objects.filter(
+        user=user, subject_id=OuterRef("subject_id"), started=True
+    ).values("unlocked_order")[:1]
+    return (
+        Step.objects.filter(pk=step_id)
+        .annotate(unlocked_order=Subquery(unlocked))
+        .values_list("order", "unlocked_order")
+        .first()
+    )
+
+
+def step_percentages(user_id, subject_id):
+    """
+    ``{step_id: best percentage}`` of a user over the steps of a subject.
+
+    Built with one grouped aggregate and cached until the user's next finished
+    attempt in the subject.
+    """
+    key = PERCENTAGES_KEY.format(user_id, subject_id)
+    percentages = cache.get(key)
+    if percentages is None:
+        percentages = dict(
+            UserTotalTestResult.objects.filter(
+                user_id=user_id,
+                step_test__step__subject_id=subject_id,
+                finished=True,
+            )
+            .values("step_test__step_id")
+            .annotate(best=Max("percentage"))
+            .order_by()
+            .values_list("step_test__step_id", "best")
+        )
+        cache.set(key, percentages, timeout=PERCENTAGES_TIMEOUT)
+    return percentages
+
+
+def rebuild(chunk_size=1000):
+    """Rebuild the progress index from passing attempts."""
+    passed = UserTotalTestResult.objects.filter(ball__gte=PASSING_BALL)
+    finished_steps = (
+        passed.values("user_id", "step_test__step_id")
+        .annotate(finished_at=Max("finished_at"))
+        .order_by("user_id", "step_test__step_id")
+    )
+    now = timezone.now()
+    batch = []
+    for row in finished_steps.iterator(chunk_size=chunk_size):
+        batch.append(
+            UserStep(
+                user_id=row["user_id"],
+                step_id=row["step_test__step_id"],
+                finished=True,
+                finished_at=row["finished_at"] or now,
+            )
+        )
+        if len(batch) >= chunk_size:
+            _save_finished(batch)
+            batch = []
+    _save_finished(batch)
+
+    best_order = (
+        passed.filter(
+            user_id=OuterRef("user_id"),
+            step_test__step__subject_id=OuterRef("subject_id"),
+        )
+        .values("user_id")
+        .annotate(order=Max("step_test__step__order"))
+        .values("order")
+    )
+    UserSubject.objects.update(
+        unlocked_order=Coalesce(Subquery(best_order) + 1, Value(1))
+    )
+
+    steps = {
+        (subject_id, order): step_id
+        for step_id, subject_id, order in Step.objects.values_list(
+            "id", "subject_id", "order"
+        )
+    }
+    frontier = UserSubject.objects.filter(started=True).values_list(
+        "user_id", "subject_id", "unlocked_order"
+    )
+    updated = 0
+    batch = []
+    for user_id, subject_id, order in frontier.iterator(chunk_size=chunk_size):
+        updated += 1
+        step_id = steps.get((subject_id, order))
+        if step_id is not None:
+            batch.append(UserStep(user_id=user_id, step_id=step_id))
+        if len(batch) >= chunk_size:
+            UserStep.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserStep.objects.bulk_create(batch, ignore_conflicts=True)
+    return updated
+
+
+def _save_finished(batch):
+    UserStep.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=["user", "step"],
+        update_fields=["finished", "finished_at"],
+    )
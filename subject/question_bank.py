@@ -0,0 +1,226 @@
+import csv
+import json
+from itertools import groupby, islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from common import richtext
+
+from subject.models import StepTest, TestAnswer, TestQuestion
+from subject.utils import bump_step_test_version
+
+FORMATS = ("jsonl", "csv")
+
+CSV_FIELDS = [
+    "question_ref",
+    "steptest",
+    "question_type",
+    "level",
+    "question",
+    "answer",
+    "is_correct",
+    "order",
+]
+
+
+TRUE_VALUES = ("1", "true", "yes")
+FALSE_VALUES = ("0", "false", "no", "")
+
+
+def parse_bool(value):
+    """Read a boolean from JSON or CSV, rejecting anything ambiguous."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def parse_order(value):
+    """Read an optional, non-negative answer order from JSON or CSV."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return value
+    raise ValueError(f"not a non-negative integer: {value!r}")
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for csv streaming."""
+
+    def write(self, value):
+        return value
+
+
+def export_questions(queryset, file_format="jsonl", chunk_size=1000):
+    """
+    Yield a question bank line by line.
+
+    Questions are read with a server-side iterator and their answers are
+    prefetched one chunk at a time, so memory stays bounded by ``chunk_size``.
+    """
+    questions = (
+        queryset.order_by("id")
+        .prefetch_related("test_answers")
+        .iterator(chunk_size=chunk_size)
+    )
+    if file_format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(CSV_FIELDS)
+        for question in questions:
+            for answer in question.test_answers.all():
+                yield writer.writerow(
+                    [
+                        question.id,
+                        question.steptest_id,
+                        question.question_type,
+                        question.level,
+                        question.question,
+                        answer.answer,
+                        int(answer.is_correct),
+                        "" if answer.order is None else answer.order,
+                    ]
+                )
+        return
+
+    for question in questions:
+        record = {
+            "steptest": question.steptest_id,
+            "question_type": question.question_type,
+            "level": question.level,
+            "question": question.question,
+            "answers": [
+                {
+                    "answer": answer.answer,
+                    "is_correct": answer.is_correct,
+                    "order": answer.order,
+                }
+                for answer in question.test_answers.all()
+            ],
+        }
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def read_jsonl(lines):
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValidationError({"file": f"Line {number} is not valid JSON"})
+
+
+def read_csv(lines):
+    rows = csv.DictReader(lines)
+    if not set(CSV_FIELDS) <= set(rows.fieldnames or ()):
+        raise ValidationError({"file": f"CSV header must contain {CSV_FIELDS}"})
+    for _, group in groupby(rows, key=lambda row: row["question_ref"]):
+        group = list(group)
+        first = group[0]
+        yield {
+            "steptest": first["steptest"],
+            "question_type": first["question_type"],
+            "level": first["level"],
+            "question": first["question"],
+            "answers": [
+                {
+                    "answer": row["answer"],
+                    "is_correct": row["is_correct"],
+                    "order": row["order"],
+                }
+                for row in group
+            ],
+        }
+
+
+def read_records(lines, file_format="jsonl"):
+    if file_format == "csv":
+        return read_csv(lines)
+    return read_jsonl(lines)
+
+
+def text_lines(uploaded_file):
+    """Decode an uploaded file lazily, one line at a time."""
+    for number, line in enumerate(uploaded_file, start=1):
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValidationError({"file": f"Line {number} is not valid UTF-8"})
+
+
+def _build_question(record):
+    try:
+        question = TestQuestion(
+            steptest_id=int(record["steptest"]),
+            question_type=record["question_type"],
+            level=record.get("level") or TestQuestion.QuestionLevel.EASY,
+            question=record["question"],
+        )
+        answers = [
+            TestAnswer(
+                answer=answer["answer"],
+                is_correct=parse_bool(answer["is_correct"]),
+                order=parse_order(answer.get("order")),
+            )
+            for answer in record.get("answers", [])
+        ]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValidationError({"file": f"Invalid question record: {e}"})
+    if question.question_type not in TestQuestion.QuestionType.values:
+        raise ValidationError(
+            {"file": f"Invalid question type: {question.question_type}"}
+        )
+    if question.level not in TestQuestion.QuestionLevel.values:
+        raise ValidationError({"file": f"Invalid level: {question.level}"})
+    richtext.prerender(question, "question")
+    for answer in answers:
+        richtext.prerender(answer, "answer")
+    return question, answers
+
+
+def import_questions(records, chunk_size=1000):
+    """
+    Create questions and answers from parsed records, one chunk at a time.
+
+    Each chunk is inserted with two ``bulk_create`` calls. The whole import
+    runs in one transaction, so a bad record anywhere leaves nothing behind.
+    Returns the number of imported questions.
+    """
+    records = iter(records)
+    imported = 0
+    with transaction.atomic():
+        while chunk := list(islice(records, chunk_size)):
+            imported += _import_chunk(chunk)
+    return imported
+
+
+def _import_chunk(chunk):
+    built = [_build_question(record) for record in chunk]
+    step_test_ids = {question.steptest_id for question, _ in built}
+    missing = step_test_ids - set(
+        StepTest.objects.filter(id__in=step_test_ids).values_list("id", flat=True)
+    )
+    if missing:
+        raise ValidationError({"file": f"Unknown step tests: {sorted(missing)}"})
+
+    questions = TestQuestion.objects.bulk_create([question for question, _ in built])
+    answers = []
+    for question, (_, question_answers) in zip(questions, built):
+        for answer in question_answers:
+            answer.test_quetion_id = question.id
+            answers.append(answer)
+    TestAnswer.objects.bulk_create(answers)
+    for step_test_id in step_test_ids:
+        bump_step_test_version(step_test_id)
+    return len(questions)
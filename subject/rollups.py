@@ -0,0 +1,116 @@
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from account.models import User
+from subject.models import UserScoreRollup, UserSubject, UserTotalTestResult
+
+ROLLUP_FIELDS = ["total_ball", "attempts_count", "best_ball", "last_attempt_at"]
+
+
+def _running_totals(ball, finished_at):
+    return {
+        "attempts_count": F("attempts_count") + 1,
+        "best_ball": Greatest(Coalesce(F("best_ball"), Value(ball)), Value(ball)),
+        "last_attempt_at": finished_at,
+    }
+
+
+def record_attempt(total_result):
+    """Add a finished attempt to the user's and the user-subject's rollups."""
+    ball = total_result.ball or 0
+    finished_at = total_result.finished_at or timezone.now()
+    user_changes = dict(
+        _running_totals(ball, finished_at), total_ball=F("total_ball") + ball
+    )
+    rollups = UserScoreRollup.objects.filter(user_id=total_result.user_id)
+    if not rollups.update(**user_changes):
+        _, created = UserScoreRollup.objects.get_or_create(
+            user_id=total_result.user_id,
+            defaults={
+                "total_ball": ball,
+                "attempts_count": 1,
+                "best_ball": ball,
+                "last_attempt_at": finished_at,
+            },
+        )
+        if not created:
+            rollups.update(**user_changes)
+
+    UserSubject.objects.filter(
+        user_id=total_result.user_id,
+        subject_id=total_result.step_test.step.subject_id,
+    ).update(
+        **_running_totals(ball, finished_at),
+        total_test_ball=F("total_test_ball") + ball,
+    )
+
+
+def _totals(results, *group_by):
+    return results.values(*group_by).annotate(
+        total_ball=Sum("ball"),
+        attempts_count=Count("id"),
+        best_ball=Max("ball"),
+        last_attempt_at=Max("finished_at"),
+    )
+
+
+def reconcile(chunk_size=1000):
+    """
+    Rebuild every rollup from raw attempts, one chunk of users at a time.
+
+    Returns the number of users processed.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return processed
+        last_id = user_ids[-1]
+        processed += len(user_ids)
+        results = UserTotalTestResult.objects.filter(
+            user_id__in=user_ids, finished=True
+        ).order_by()
+
+        user_totals = {row["user_id"]: row for row in _totals(results, "user_id")}
+        rollups = []
+        for user_id in user_ids:
+            totals = user_totals.get(user_id, {})
+            rollups.append(
+                UserScoreRollup(
+                    user_id=user_id,
+                    total_ball=totals.get("total_ball") or 0,
+                    attempts_count=totals.get("attempts_count", 0),
+                    best_ball=totals.get("best_ball"),
+                    last_attempt_at=totals.get("last_attempt_at"),
+                )
+            )
+        UserScoreRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=ROLLUP_FIELDS,
+        )
+
+        subject_totals = {
+            (row["user_id"], row["step_test__step__subject_id"]): row
+            for row in _totals(results, "user_id", "step_test__step__subject_id")
+        }
+        user_subjects = list(UserSubject.objects.filter(user_id__in=user_ids))
+        for user_subject in user_subjects:
+            totals = subject_totals.get(
+                (user_subject.user_id, user_subject.subject_id), {}
+            )
+            user_subject.total_test_ball = totals.get("total_ball") or 0
+            user_subject.attempts_count = totals.get("attempts_count", 0)
+            user_subject.best_ball = totals.get("best_ball")
+            user_subject.last_attempt_at = totals.get("last_attempt_at")
+        UserSubject.objects.bulk_update(
+            user_subjects,
+            ["total_test_ball", "attempts_count", "best_ball", "last_attempt_at"],
+        )
@@ -0,0 +1,56 @@
+import random
+from bisect import bisect_right
+
+from subject.models import StepTest, TestQuestion
+from subject.utils import step_test_cache
+
+TEST_TYPE_LEVELS = {
+    StepTest.TestTypes.MIDTERM: (
+        TestQuestion.QuestionLevel.EASY,
+        TestQuestion.QuestionLevel.MEDIUM,
+    ),
+    StepTest.TestTypes.FINAL: (TestQuestion.QuestionLevel.HARD,),
+}
+
+
+def get_level_pools(step_test_id):
+    """Question ids of a step test grouped by level, cached per content version."""
+    return step_test_cache.get_or_build(
+        step_test_id, "level-pools", lambda: load_level_pools(step_test_id)
+    )
+
+
+def load_level_pools(step_test_id):
+    pools = {}
+    for question_id, level in (
+        TestQuestion.objects.filter(steptest_id=step_test_id)
+        .order_by("id")
+        .values_list("id", "level")
+    ):
+        pools.setdefault(level, []).append(question_id)
+    return {level: tuple(question_ids) for level, question_ids in pools.items()}
+
+
+def sample_question_ids(step_test):
+    """
+    Pick ``question_count`` random question ids for a step test.
+
+    Indexes are drawn over the concatenated level pools without building the
+    concatenation, so the cost depends on ``question_count`` only.
+    """
+    pools = get_level_pools(step_test.pk)
+    levels = TEST_TYPE_LEVELS.get(
+        step_test.test_type, TEST_TYPE_LEVELS[StepTest.TestTypes.FINAL]
+    )
+    selected = [pools.get(level, ()) for level in levels]
+    offsets = []
+    total = 0
+    for pool in selected:
+        offsets.append(total)
+        total += len(pool)
+    indexes = random.sample(range(total), min(step_test.question_count, total))
+    question_ids = []
+    for index in indexes:
+        position = bisect_right(offsets, index) - 1
+        question_ids.append(selected[position][index - offsets[position]])
+    return question_ids
@@ -1,19 +1,22 @@
 from rest_framework import serializers
 
 from account.serializers import UserSerializer
-from common.serializers import MediaURlSerializer
+from common.serializers import MediaURlSerializer, RichTextField
 from subject.models import (
     Category,
+    LeaderboardEntry,
     Step,
     StepFile,
     Subject,
     TestAnswer,
     TestQuestion,
+    TestSubmission,
     UserStep,
     UserSubject,
     UserTestResult,
     UserTotalTestResult,
 )
+from subject.question_bank import FORMATS
 
 
 class StepSerializer(serializers.ModelSerializer):
@@ -25,7 +28,8 @@ class StepSerializer(serializers.ModelSerializer):
         fields = ["id", "order", "percentage"]
 
     def get_percentage(self, obj):
-        return 0
+        percentage = self.context.get("step_percentages", {}).get(obj.id)
+        return percentage or 0
 
 
 class UserStepSerializer(serializers.ModelSerializer):
@@ -37,7 +41,7 @@ class UserStepSerializer(serializers.ModelSerializer):
 
 
 class SubjectSerializer(serializers.ModelSerializer):
-    image = MediaURlSerializer()
+    image = MediaURlSerializer(preset="card")
 
     class Meta:
         model = Subject
@@ -57,12 +61,22 @@ class UserSubjectSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = UserSubject
-        fields = ["id", "subject", "total_test_ball", "started_time", "started"]
+        fields = [
+            "id",
+            "subject",
+            "total_test_ball",
+            "attempts_count",
+            "best_ball",
+            "last_attempt_at",
+            "unlocked_order",
+            "started_time",
+            "started",
+        ]
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    bg_image = MediaURlSerializer(read_only=True)
-    icon = MediaURlSerializer(read_only=True)
+    bg_image = MediaURlSerializer(read_only=True, preset="card")
+    icon = MediaURlSerializer(read_only=True, preset="icon")
 
     class Meta:
         model = Category
@@ -84,6 +98,7 @@ class StepFilesSerializer(serializers.ModelSerializer):
 
 
 class StepDetailSerializer(serializers.ModelSerializer):
+    description = RichTextField()
     step_files = StepFilesSerializer(many=True)
 
     class Meta:
@@ -96,12 +111,15 @@ class StartStepTestSerializer(serializers.Serializer):
 
 
 class TestAnswerSerializer(serializers.ModelSerializer):
+    answer = RichTextField()
+
     class Meta:
         model = TestAnswer
         fields = ("id", "answer")
 
 
 class StepTestQuestionTestSerializer(serializers.ModelSerializer):
+    question = RichTextField()
     test_answers = TestAnswerSerializer(many=True)
 
     class Meta:
@@ -109,6 +127,45 @@ class StepTestQuestionTestSerializer(serializers.ModelSerializer):
         fields = ("id", "question_type", "question", "test_answers")
 
 
+class TestQuestionSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TestQuestion
+        fields = ("id", "steptest", "question_type", "level", "question_text")
+
+
+class TestAnswerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TestAnswer
+        fields = ("id", "test_quetion")
+
+
+class TestQuestionFilterSerializer(serializers.Serializer):
+    steptest = serializers.IntegerField(required=False)
+    level = serializers.ChoiceField(
+        choices=TestQuestion.QuestionLevel.choices, required=False
+    )
+    question_type = serializers.ChoiceField(
+        choices=TestQuestion.QuestionType.choices, required=False
+    )
+    view = serializers.ChoiceField(choices=["full", "summary"], default="full")
+
+
+class TestAnswerFilterSerializer(serializers.Serializer):
+    question = serializers.IntegerField(required=False)
+    steptest = serializers.IntegerField(required=False)
+    view = serializers.ChoiceField(choices=["full", "summary"], default="full")
+
+
+class QuestionBankExportSerializer(serializers.Serializer):
+    steptest = serializers.IntegerField(required=False)
+    file_format = serializers.ChoiceField(choices=FORMATS, default="jsonl")
+
+
+class QuestionBankImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=FORMATS, default="jsonl")
+
+
 class FinishTestQuestionSerializer(serializers.Serializer):
     question_id = serializers.IntegerField(required=True)
     answer_ids = serializers.ListField(child=serializers.IntegerField())
@@ -116,11 +173,13 @@ class FinishTestQuestionSerializer(serializers.Serializer):
 
 class StepTestFinishSerializer(serializers.Serializer):
     result_id = serializers.IntegerField(required=True)
-    questions = serializers.ListField(child=FinishTestQuestionSerializer())
+    questions = serializers.ListField(
+        child=FinishTestQuestionSerializer(), allow_empty=False
+    )
 
 
 class UserTestResultSerializer(serializers.ModelSerializer):
-    test_question = serializers.StringRelatedField()
+    test_question = serializers.CharField(source="test_question_id")
     test_answers = TestAnswerSerializer(many=True)
 
     class Meta:
@@ -130,6 +189,7 @@ class UserTestResultSerializer(serializers.ModelSerializer):
 
 class UserTotalTestResultSerializer(serializers.ModelSerializer):
     user_test_results = UserTestResultSerializer(many=True)
+    status = serializers.SerializerMethodField()
 
     class Meta:
         model = UserTotalTestResult
@@ -142,9 +202,18 @@ class UserTotalTestResultSerializer(serializers.ModelSerializer):
             "user_test_results",
             "finished",
             "percentage",
+            "status",
         ]
         read_only_fields = ["id", "user", "step_test"]
 
+    def get_status(self, obj):
+        if obj.finished:
+            return TestSubmission.Status.FINISHED
+        submission = getattr(obj, "submission", None)
+        if submission is not None:
+            return submission.status
+        return None
+
 
 class UserTestsResultIDSerializer(serializers.Serializer):
     result_id = serializers.IntegerField(required=True)
@@ -152,5 +221,28 @@ class UserTestsResultIDSerializer(serializers.Serializer):
 
 class UserTestResultForSubmitSerializer(serializers.Serializer):
     result_id = serializers.IntegerField()
-    test_question = serializers.IntegerField()
-    test_answers = serializers.ListField(child=serializers.IntegerField())
+    test_question = serializers.ListField(
+        child=FinishTestQuestionSerializer(), default=list
+    )
+
+
+class SaveTestAnswerSerializer(FinishTestQuestionSerializer):
+    result_id = serializers.IntegerField(required=True)
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    rank = serializers.SerializerMethodField()
+    first_name = serializers.CharField(source="user.first_name")
+    last_name = serializers.CharField(source="user.last_name")
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ["rank", "user", "first_name", "last_name", "ball", "achieved_at"]
+
+    def get_rank(self, obj):
+        return self.context["ranks"][obj.pk]
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+    neighbors = serializers.IntegerField(default=3, min_value=0, max_value=20)
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from common import richtext
+from common.models import Media
+from subject import catalog, leaderboards, progress, rollups
+from subject.models import (
+    Category,
+    Step,
+    StepFile,
+    Subject,
+    TestAnswer,
+    TestQuestion,
+    UserTotalTestResult,
+)
+from subject.utils import RICH_TEXT_FIELDS, bump_step_test_version
+
+# Sent inside the grading transaction once an attempt has been scored.
+# Arguments: "total_result".
+test_finished = Signal()
+
+
+@receiver(pre_save, sender=Step)
+@receiver(pre_save, sender=TestQuestion)
+@receiver(pre_save, sender=TestAnswer)
+def prerender_rich_text(sender, instance, **kwargs):
+    richtext.prerender(instance, RICH_TEXT_FIELDS[sender])
+
+
+@receiver([post_save, post_delete], sender=TestQuestion)
+def test_question_changed(sender, instance, **kwargs):
+    bump_step_test_version(instance.steptest_id)
+
+
+@receiver([post_save, post_delete], sender=TestAnswer)
+def test_answer_changed(sender, instance, **kwargs):
+    step_test_id = (
+        TestQuestion.objects.filter(pk=instance.test_quetion_id)
+        .values_list("steptest_id", flat=True)
+        .first()
+    )
+    if step_test_id is not None:
+        bump_step_test_version(step_test_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Step)
+@receiver([post_save, post_delete], sender=StepFile)
+@receiver([post_save, post_delete], sender=Media)
+def catalog_changed(sender, **kwargs):
+    catalog.bump_version()
+
+
+@receiver(test_finished, sender=UserTotalTestResult)
+def update_leaderboards(sender, total_result, **kwargs):
+    leaderboards.record_attempt(total_result)
+
+
+@receiver(test_finished, sender=UserTotalTestResult)
+def update_score_rollups(sender, total_result, **kwargs):
+    rollups.record_attempt(total_result)
+
+
+@receiver(test_finished, sender=UserTotalTestResult)
+def update_step_progress(sender, total_result, **kwargs):
+    progress.record_attempt(total_result)
@@ -0,0 +1,105 @@
+import logging
+import threading
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from subject.grading import (
+    SCORING_RULES,
+    attempt_rule,
+    check_submission,
+    grade_attempt,
+)
+from subject.models import TestSubmission
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_submission(total_result, questions, scoring):
+    """
+    Check a submission and store it as one raw payload row to be graded later.
+
+    ``total_result`` must be locked by the caller inside a transaction.
+    """
+    check_submission(total_result, questions)
+    attempt_rule(total_result, scoring)
+    return TestSubmission.objects.create(
+        total_result=total_result,
+        scoring=total_result.scoring,
+        questions=[
+            {"question_id": qst["question_id"], "answer_ids": list(qst["answer_ids"])}
+            for qst in questions
+        ],
+    )
+
+
+def process_submissions(batch_size=100):
+    """
+    Grade one batch of pending submissions and return how many were handled.
+
+    Rows are claimed with ``SKIP LOCKED`` so several workers can drain the
+    queue side by side. A failing submission is marked as failed without
+    rolling back the rest of the batch.
+    """
+    with transaction.atomic():
+        submissions = list(
+            TestSubmission.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("total_result__step_test")
+            .filter(status=TestSubmission.Status.PENDING)
+            .order_by("id")[:batch_size]
+        )
+        for submission in submissions:
+            try:
+                with transaction.atomic():
+                    grade_attempt(
+                        submission.total_result,
+                        submission.questions,
+                        SCORING_RULES[submission.scoring],
+                    )
+                submission.status = TestSubmission.Status.FINISHED
+            except Exception as e:
+                logger.exception("Grading submission %s failed", submission.pk)
+                submission.status = TestSubmission.Status.FAILED
+                submission.error = str(e)
+            submission.processed_at = timezone.now()
+        TestSubmission.objects.bulk_update(
+            submissions, ["status", "error", "processed_at"]
+        )
+    return len(submissions)
+
+
+class SubmissionWorkerPool:
+    """Threads that keep draining the submission queue until stopped."""
+
+    def __init__(self, workers=4, batch_size=100, interval=1.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"submission-worker-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                processed = process_submissions(self.batch_size)
+            except Exception:
+                logger.exception("Submission worker failed")
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.interval)
+        close_old_connections()
@@ -1,3 +1,895 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from account.models import User
+from common.models import Media
+from subject import catalog, clicks, leaderboards, progress, question_bank, rollups
+from subject.models import (
+    Category,
+    Step,
+    StepFile,
+    StepTest,
+    Subject,
+    TestAnswer,
+    TestQuestion,
+    UserScoreRollup,
+    UserStep,
+    UserSubject,
+    UserTestResult,
+    UserTotalTestResult,
+)
+from subject.grading import get_answer_keys
+from subject.papers import get_paper_snapshot
+from subject.sampling import sample_question_ids
+from subject.submissions import process_submissions
+from subject.utils import prerender_rich_text
+
+
+def create_step_test(
+    question_count, question_type=TestQuestion.QuestionType.SINGLE, ball_for_each_test=2
+):
+    category = Category.objects.create(name=f"Category {Category.objects.count()}")
+    subject = Subject.objects.create(name="Subject", category=category)
+    step = Step.objects.create(title="Step", order=1, subject=subject, description="")
+    step_test = StepTest.objects.create(
+        step=step,
+        ball_for_each_test=ball_for_each_test,
+        question_count=question_count,
+        test_type=StepTest.TestTypes.MIDTERM,
+        time_for_test=timedelta(minutes=30),
+    )
+    for _ in range(question_count):
+        question = TestQuestion.objects.create(
+            steptest=step_test, question_type=question_type, question="<p>?</p>"
+        )
+        for order, is_correct in ((1, True), (2, False), (3, False)):
+            TestAnswer.objects.create(
+                test_quetion=question, answer="<p>a</p>", is_correct=is_correct, order=order
+            )
+    return step_test
+
+
+def correct_submission(step_test):
+    submission = []
+    for question in step_test.test_questions.prefetch_related("test_answers"):
+        answers = sorted(question.test_answers.all(), key=lambda answer: answer.order)
+        if question.question_type == TestQuestion.QuestionType.ORDERING:
+            answer_ids = [answer.id for answer in answers]
+        else:
+            answer_ids = [answer.id for answer in answers if answer.is_correct]
+        submission.append({"question_id": question.id, "answer_ids": answer_ids})
+    return submission
+
+
+class GradingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, question_count, ball_for_each_test=2):
+        step_test = create_step_test(
+            question_count, ball_for_each_test=ball_for_each_test
+        )
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        payload = {"result_id": result.id, "test_question": correct_submission(step_test)}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("submit-test"), payload, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return result, response, len(queries)
+
+    def test_submit_scores_every_question(self):
+        result, response, _ = self.submit(4)
+        self.assertEqual(response.data["ball"], 8)
+        self.assertEqual(response.data["percentage"], 100)
+        result.refresh_from_db()
+        self.assertTrue(result.finished)
+        self.assertEqual(result.total_results.count(), 4)
+        self.assertEqual(
+            UserTestResult.test_answers.through.objects.filter(
+                usertestresult__total_result=result
+            ).count(),
+            4,
+        )
+
+    def test_submit_query_count_does_not_depend_on_question_count(self):
+        self.submit(1)
+        _, _, small = self.submit(3, ball_for_each_test=20)
+        _, _, large = self.submit(30)
+        self.assertEqual(small, large)
+        _, _, failing_small = self.submit(3)
+        _, _, failing_large = self.submit(25)
+        self.assertEqual(failing_small, failing_large)
+
+    def test_ordering_question_requires_the_correct_sequence(self):
+        step_test = create_step_test(1, TestQuestion.QuestionType.ORDERING)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        submission = correct_submission(step_test)
+        submission[0]["answer_ids"].reverse()
+        response = self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": submission},
+            format="json",
+        )
+        self.assertEqual(response.data["ball"], 0)
+
+    def test_finish_rejects_foreign_questions(self):
+        step_test = create_step_test(1)
+        other = create_step_test(1)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        response = self.client.post(
+            reverse("finish-step-test"),
+            {"result_id": result.id, "questions": correct_submission(other)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserTestResult.objects.exists())
+
+    def test_answer_key_changes_invalidate_the_cache(self):
+        step_test = create_step_test(1)
+        submission = correct_submission(step_test)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": submission},
+            format="json",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            TestAnswer.objects.get(id=submission[0]["answer_ids"][0]).delete()
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        response = self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": submission},
+            format="json",
+        )
+        self.assertEqual(response.data["ball"], 0)
+
+    def test_finish_counts_answers_without_reading_answer_rows(self):
+        step_test = create_step_test(2)
+        submission = correct_submission(step_test)
+        wrong = TestAnswer.objects.filter(
+            test_quetion_id=submission[1]["question_id"], is_correct=False
+        ).first()
+        submission[1]["answer_ids"] = [wrong.id]
+        get_answer_keys(step_test.pk)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("finish-step-test"),
+                {"result_id": result.id, "questions": submission},
+                format="json",
+            )
+        self.assertEqual(response.data["correct_answers_count"], 1)
+        self.assertEqual(response.data["incorrect_answers_count"], 1)
+        # Only the response lists the chosen answers; grading counts nothing there.
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if "COUNT" in query["sql"] and "subject_testanswer" in query["sql"]
+            ]
+        )
+
+    def test_autosaved_answers_are_added_up_on_submit(self):
+        step_test = create_step_test(3)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        submission = correct_submission(step_test)
+        wrong = {"question_id": submission[0]["question_id"], "answer_ids": []}
+        for answer in [wrong, submission[0], submission[0], submission[1]]:
+            response = self.client.post(
+                reverse("save-test-answer"),
+                {"result_id": result.id, **answer},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(result.total_results.count(), 2)
+
+        response = self.client.post(
+            reverse("submit-test"), {"result_id": result.id}, format="json"
+        )
+        self.assertEqual(response.data["ball"], 4)
+        self.assertEqual(int(response.data["percentage"]), 66)
+
+    def test_unanswered_questions_count_against_the_percentage(self):
+        step_test = create_step_test(4)
+        submission = correct_submission(step_test)
+        result = UserTotalTestResult.objects.create(
+            step_test=step_test,
+            user=self.user,
+            question_ids=[qst["question_id"] for qst in submission[:2]],
+        )
+        submission = submission[:1]
+        response = self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": submission},
+            format="json",
+        )
+        self.assertEqual(response.data["percentage"], 50)
+
+    def test_the_first_recorded_answer_fixes_the_scoring_rule(self):
+        step_test = create_step_test(2)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        submission = correct_submission(step_test)
+        self.client.post(
+            reverse("save-test-answer"),
+            {"result_id": result.id, **submission[0]},
+            format="json",
+        )
+        response = self.client.post(
+            reverse("finish-step-test"),
+            {"result_id": result.id, "questions": submission[1:]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        result.refresh_from_db()
+        self.assertEqual(result.scoring, "submit")
+        self.assertEqual(response.data["ball"], 4)
+        self.assertEqual(response.data["percentage"], 100)
+
+    def test_finished_attempts_update_score_rollups(self):
+        self.assertEqual(self.user.user_total_ball, 0)
+        result, _, _ = self.submit(2)
+        UserSubject.objects.create(user=self.user, subject=result.step_test.step.subject)
+        result, _, _ = self.submit(3)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.score_rollup.attempts_count, 2)
+        self.assertEqual(self.user.user_total_ball, 5)
+        user_subject = UserSubject.objects.get(user=self.user)
+        self.assertEqual(user_subject.total_test_ball, 0)
+
+        UserScoreRollup.objects.all().delete()
+        rollups.reconcile(chunk_size=1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.score_rollup.best_ball, 6)
+        user_subject.refresh_from_db()
+        self.assertEqual(user_subject.total_test_ball, 4)
+
+
+class RichTextTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_questions_are_served_pre_rendered(self):
+        step_test = create_step_test(1)
+        question = step_test.test_questions.get()
+        question.question = "<p>What is\n   <i>2 + 2</i>?</p><script>x()</script>"
+        question.save()
+        self.assertEqual(question.question_text, "What is 2 + 2?")
+
+        snapshot = json.loads(get_paper_snapshot(step_test.pk)[question.pk])
+        self.assertEqual(snapshot["question"], "<p>What is <i>2 + 2</i>?</p>")
+
+    def test_backfill_renders_existing_rows(self):
+        create_step_test(1)
+        TestQuestion.objects.update(question_rendered=None, question_text="")
+        version = catalog.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(prerender_rich_text(batch_size=2), 5)
+        question = TestQuestion.objects.get()
+        self.assertEqual(question.question_text, "?")
+        self.assertIsNotNone(question.question_rendered)
+        self.assertNotEqual(catalog.get_version(), version)
+
+
+class SamplingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_midterm_samples_easy_and_medium_questions_only(self):
+        step_test = create_step_test(6)
+        questions = list(step_test.test_questions.all())
+        for question, level in zip(questions, ["easy", "medium", "hard"] * 2):
+            question.level = level
+            question.save()
+        step_test.question_count = 3
+        question_ids = sample_question_ids(step_test)
+        self.assertEqual(len(set(question_ids)), 3)
+        self.assertFalse(
+            TestQuestion.objects.filter(id__in=question_ids, level="hard").exists()
+        )
+
+
+class StartStepTestTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_start_returns_questions_from_the_snapshot(self):
+        step_test = create_step_test(5)
+        step_test.question_count = 3
+        step_test.save()
+        UserStep.objects.create(user=self.user, step=step_test.step)
+        response = self.client.post(
+            reverse("step-start-test"), {"step_id": step_test.step_id}, format="json"
+        )
+        data = response.json()
+        self.assertEqual(len(data["questions"]), 3)
+        self.assertEqual(len(data["questions"][0]["test_answers"]), 3)
+        self.assertTrue(UserTotalTestResult.objects.filter(id=data["result_id"]).exists())
+
+    def test_answers_outside_the_sampled_paper_are_rejected(self):
+        step_test = create_step_test(5)
+        step_test.question_count = 2
+        step_test.save()
+        UserStep.objects.create(user=self.user, step=step_test.step)
+        data = self.client.post(
+            reverse("step-start-test"), {"step_id": step_test.step_id}, format="json"
+        ).json()
+        result = UserTotalTestResult.objects.get(id=data["result_id"])
+        paper = [question["id"] for question in data["questions"]]
+        self.assertEqual(result.question_ids, paper)
+
+        outside = [
+            qst
+            for qst in correct_submission(step_test)
+            if qst["question_id"] not in paper
+        ]
+        response = self.client.post(
+            reverse("save-test-answer"),
+            {"result_id": result.id, **outside[0]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            reverse("finish-step-test"),
+            {"result_id": result.id, "questions": outside},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(result.total_results.exists())
+
+
+class StepProgressTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.step_test = create_step_test(2)
+        self.step_test.ball_for_each_test = 30
+        self.step_test.save()
+        self.first = self.step_test.step
+        self.second = Step.objects.create(
+            title="Step 2", order=2, subject=self.first.subject, description=""
+        )
+        Step.objects.create(
+            title="Other", order=1, subject=create_step_test(1).step.subject, description=""
+        )
+
+    def open_step(self, step):
+        return self.client.get(reverse("step-detail", kwargs={"pk": step.pk}))
+
+    def pass_first_step(self):
+        result = UserTotalTestResult.objects.create(
+            step_test=self.step_test, user=self.user
+        )
+        self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": correct_submission(self.step_test)},
+            format="json",
+        )
+
+    def test_passing_a_step_unlocks_the_next_one(self):
+        self.assertEqual(self.open_step(self.first).status_code, 400)
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        self.assertTrue(UserStep.objects.filter(user=self.user, step=self.first).exists())
+        with self.assertNumQueries(3):
+            response = self.open_step(self.first)
+        self.assertEqual(response.data["id"], self.first.pk)
+        self.assertEqual(self.open_step(self.second).status_code, 400)
+
+        self.pass_first_step()
+        self.assertEqual(self.open_step(self.second).data["id"], self.second.pk)
+        self.assertTrue(
+            UserStep.objects.get(user=self.user, step=self.first).finished
+        )
+        self.assertTrue(UserStep.objects.filter(user=self.user, step=self.second).exists())
+
+    def test_revalidation_does_not_skip_the_unlock_gate(self):
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        etag = self.open_step(self.first).headers["ETag"]
+        url = reverse("step-detail", kwargs={"pk": self.first.pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        stranger = APIClient()
+        stranger.force_authenticate(
+            User.objects.create_user(email="stranger@example.com", password="pass")
+        )
+        self.assertEqual(stranger.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 400)
+        second = reverse("step-detail", kwargs={"pk": self.second.pk})
+        self.assertEqual(self.client.get(second, HTTP_IF_NONE_MATCH=etag).status_code, 400)
+
+    def test_passed_steps_can_be_retaken(self):
+        url = reverse("step-start-test")
+        self.assertEqual(
+            self.client.post(url, {"step_id": self.first.pk}, format="json").status_code,
+            400,
+        )
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        self.pass_first_step()
+        response = self.client.post(url, {"step_id": self.first.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserStep.objects.get(user=self.user, step=self.first).finished)
+
+    def test_start_subject_reports_best_percentage_per_step(self):
+        url = reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        steps = self.client.post(url).data["subject"]["steps"]
+        self.assertEqual([step["percentage"] for step in steps], [0, 0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pass_first_step()
+        with self.assertNumQueries(4):
+            steps = self.client.post(url).data["subject"]["steps"]
+        percentages = {step["id"]: step["percentage"] for step in steps}
+        self.assertEqual(percentages, {self.first.pk: 100, self.second.pk: 0})
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_step_files_are_served_to_students_who_unlocked_the_step(self):
+        media = Media.objects.create(type="video", file="step-test-clip.mp4")
+        with open(os.path.join(tempfile.gettempdir(), media.file.name), "wb") as file:
+            file.write(b"video")
+        self.addCleanup(os.remove, file.name)
+        StepFile.objects.create(title="Clip", file=media, step=self.second)
+        url = "/media/" + media.file.name
+
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.pass_first_step()
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_step_files_are_not_served_under_non_canonical_paths(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        media, _ = Media.objects.store(ContentFile(b"video", name="clip.mp4"), "video")
+        StepFile.objects.create(title="Clip", file=media, step=self.second)
+        directory, name = media.file.name.rsplit("/", 1)
+        for path in (
+            f"{directory}//{name}",
+            f"{directory}/./{name}",
+            f"./{media.file.name}",
+        ):
+            self.assertEqual(APIClient().get("/media/" + path).status_code, 404)
+        self.assertEqual(APIClient().get("/media/" + media.file.name).status_code, 401)
+
+    def test_variants_of_step_images_are_limited_like_the_image(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        buffer = io.BytesIO()
+        Image.new("RGB", (10, 10), "red").save(buffer, "PNG")
+        media, _ = Media.objects.store(
+            ContentFile(buffer.getvalue(), name="slide.png"), "image"
+        )
+        StepFile.objects.create(title="Slide", file=media, step=self.second)
+        url = reverse("media-variant", kwargs={"pk": media.pk, "preset": "thumb"})
+
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.pass_first_step()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("private", response["Cache-Control"])
+
+        variant = response["Location"]
+        self.assertIn("/media/media_variants/", variant)
+        self.assertEqual(APIClient().get(variant).status_code, 401)
+        response = self.client.get(variant)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+        os.remove(os.path.join(media_root, media.file.name))
+        self.assertEqual(APIClient().get("/media/" + media.file.name).status_code, 401)
+        self.assertEqual(self.client.get("/media/" + media.file.name).status_code, 404)
+
+    def test_rebuild_restores_progress_from_history(self):
+        self.client.post(
+            reverse("start-subject", kwargs={"subject_id": self.first.subject_id})
+        )
+        self.pass_first_step()
+        UserStep.objects.all().delete()
+        UserSubject.objects.update(unlocked_order=1)
+
+        self.assertEqual(progress.rebuild(), 1)
+        self.assertEqual(UserSubject.objects.get(user=self.user).unlocked_order, 2)
+        self.assertEqual(
+            set(UserStep.objects.values_list("step_id", "finished")),
+            {(self.first.pk, True), (self.second.pk, False)},
+        )
+
+
+@override_settings(ASYNC_TEST_SUBMISSIONS=True)
+class AsyncSubmissionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="student@example.com", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_submission_is_pending_until_a_worker_grades_it(self):
+        step_test = create_step_test(3)
+        result = UserTotalTestResult.objects.create(step_test=step_test, user=self.user)
+        response = self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": correct_submission(step_test)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 202)
+        url = reverse("get_test", kwargs={"result_id": result.id})
+        self.assertEqual(self.client.get(url).data["status"], "pending")
+
+        self.assertEqual(process_submissions(), 1)
+        data = self.client.get(url).data
+        self.assertEqual(data["status"], "finished")
+        self.assertEqual(data["ball"], 6)
+
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.step_test = create_step_test(2)
+        self.client = APIClient()
+
+    def finish(self, email, correct):
+        user = User.objects.create_user(email=email, password="pass")
+        return self.attempt(user, correct)
+
+    def attempt(self, user, correct):
+        self.client.force_authenticate(user)
+        result = UserTotalTestResult.objects.create(step_test=self.step_test, user=user)
+        submission = correct_submission(self.step_test)
+        for qst in submission[correct:]:
+            qst["answer_ids"] = []
+        self.client.post(
+            reverse("submit-test"),
+            {"result_id": result.id, "test_question": submission},
+            format="json",
+        )
+        return user
+
+    def test_users_are_ranked_by_best_ball(self):
+        first = self.finish("first@example.com", 2)
+        self.finish("second@example.com", 1)
+        self.finish("third@example.com", 0)
+        self.client.force_authenticate(first)
+        response = self.client.get(
+            reverse("step-test-leaderboard", kwargs={"pk": self.step_test.pk})
+        )
+        self.assertEqual([entry["rank"] for entry in response.data], [1, 2, 3])
+        self.assertEqual(response.data[0]["user"], first.pk)
+
+        subject_id = self.step_test.step.subject_id
+        response = self.client.get(
+            reverse("subject-leaderboard-standing", kwargs={"pk": subject_id})
+        )
+        self.assertEqual(response.data["rank"], 1)
+        self.assertEqual(len(response.data["entries"]), 3)
+
+    def test_rebuild_keeps_the_order_of_ties(self):
+        first = self.finish("first@example.com", 1)
+        second = self.finish("second@example.com", 1)
+        self.attempt(first, 1)
+        url = reverse("step-test-leaderboard", kwargs={"pk": self.step_test.pk})
+        self.assertEqual(
+            [entry["user"] for entry in self.client.get(url).data],
+            [first.pk, second.pk],
+        )
+        leaderboards.rebuild()
+        self.assertEqual(
+            [entry["user"] for entry in self.client.get(url).data],
+            [first.pk, second.pk],
+        )
+
+    def test_rebuild_drops_rank_sets_after_commit(self):
+        client = mock.Mock()
+        client.scan_iter.return_value = ["rank"]
+        with mock.patch("subject.leaderboards.redis_client", return_value=client):
+            with self.captureOnCommitCallbacks() as callbacks:
+                leaderboards.rebuild()
+            client.delete.assert_not_called()
+            for callback in callbacks:
+                callback()
+        client.delete.assert_called_once_with("rank")
+
+
+class CategoryClickTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_clicks_are_buffered_until_flushed(self):
+        category = Category.objects.create(name="Math")
+        for _ in range(3):
+            clicks.record_click(category.pk)
+        category.refresh_from_db()
+        self.assertEqual(category.click_count, 0)
+
+        self.assertEqual(clicks.flush_clicks(), 3)
+        self.assertEqual(clicks.flush_clicks(), 0)
+        category.refresh_from_db()
+        self.assertEqual(category.click_count, 3)
+
+    def test_counters_evicted_during_a_flush_are_skipped(self):
+        category = Category.objects.create(name="Math")
+        key = clicks.CLICK_KEY.format(category.pk)
+        with mock.patch.object(clicks.cache, "get_many", return_value={key: 2}):
+            self.assertEqual(clicks.flush_clicks(), 0)
+        category.refresh_from_db()
+        self.assertEqual(category.click_count, 0)
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_is_served_from_cache_until_it_changes(self):
+        category = Category.objects.create(name="Math")
+        Subject.objects.create(name="Algebra", category=category)
+        url = reverse("category-subject", kwargs={"pk": category.pk})
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get(url).json()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subject.objects.create(name="Geometry", category=category)
+        self.assertEqual(len(self.client.get(url).json()), 2)
+        self.assertEqual(catalog.catalog_cache.stats()["local_hits"], 1)
+
+    def test_unchanged_catalog_answers_not_modified(self):
+        category = Category.objects.create(name="Math")
+        url = reverse("category-subject", kwargs={"pk": category.pk})
+        etag = self.client.get(url).headers["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(cache.get(clicks.CLICK_KEY.format(category.pk)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subject.objects.create(name="Algebra", category=category)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_category_media_is_loaded_with_the_categories(self):
+        for number in range(30):
+            Category.objects.create(
+                name=f"Category {number}",
+                icon=Media.objects.create(type="image", file=f"media_files/{number}.png"),
+            )
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("categories"), {"page_size": 50})
+        self.assertIn("/api/common/media/", response.data["results"][0]["icon"])
+
+    def test_unknown_query_parameters_share_one_entry(self):
+        Category.objects.create(name="Math")
+        url = reverse("categories")
+        self.client.get(url, {"page_size": 10})
+        with self.assertNumQueries(0):
+            for number in range(3):
+                self.client.get(url, {"page_size": 10, "x": number})
+        self.assertEqual(catalog.catalog_cache.stats()["local_hits"], 3)
+
+    def test_cached_next_links_keep_the_scheme_and_drop_extra_parameters(self):
+        for number in range(3):
+            Category.objects.create(name=f"Category {number}")
+        url = reverse("categories")
+        data = self.client.get(url, {"page_size": 2, "x": "1"}).json()
+        self.assertTrue(data["next"].startswith("http://testserver/"))
+        self.assertNotIn("x=", data["next"])
+        self.assertIn("page_size=2", data["next"])
+
+        data = self.client.get(url, {"page_size": 2}, secure=True).json()
+        self.assertTrue(data["next"].startswith("https://testserver/"))
+
+
+class PaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_categories_are_paged_by_clicks_then_id(self):
+        for number, clicks_count in enumerate([5, 1, 5, 0, 1]):
+            Category.objects.create(name=f"Category {number}", click_count=clicks_count)
+        expected = list(
+            Category.objects.order_by("-click_count", "id").values_list("id", flat=True)
+        )
+        seen = []
+        url = reverse("categories") + "?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [category["id"] for category in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, expected)
+
+    def test_mistyped_cursors_are_not_found(self):
+        Category.objects.create(name="Math")
+        for position in (["abc", 1], [1, None], [[], 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(reverse("categories"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class TestQuestionViewSetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(email="teacher@example.com", password="pass")
+        )
+
+    def test_list_costs_a_fixed_number_of_queries(self):
+        url = reverse("question-step-test-list")
+        for question_count in (2, 10):
+            step_test = create_step_test(question_count)
+            with self.assertNumQueries(2):
+                response = self.client.get(url, {"steptest": step_test.pk})
+            self.assertEqual(len(response.data["results"]), question_count)
+            self.assertEqual(len(response.data["results"][0]["test_answers"]), 3)
+
+    def test_summary_view_leaves_out_the_question_body(self):
+        step_test = create_step_test(2)
+        response = self.client.get(
+            reverse("question-step-test-list"),
+            {"steptest": step_test.pk, "level": "easy", "view": "summary"},
+        )
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertNotIn("question", response.data["results"][0])
+
+    def test_answer_summary_leaves_out_the_ordering_key(self):
+        step_test = create_step_test(1, TestQuestion.QuestionType.ORDERING)
+        response = self.client.get(
+            reverse("answer-step-test-list"),
+            {"steptest": step_test.pk, "view": "summary"},
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertNotIn("order", response.data["results"][0])
+
+    def test_question_list_is_revalidated_per_step_test(self):
+        url = reverse("question-step-test-list")
+        first, second = create_step_test(1), create_step_test(1)
+        etag = self.client.get(url, {"steptest": first.pk}).headers["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, {"steptest": first.pk}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TestQuestion.objects.create(
+                steptest=second, question_type="single", question="<p>?</p>"
+            )
+        response = self.client.get(url, {"steptest": first.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class QuestionBankTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                email="teacher@example.com", password="pass", role="teacher"
+            )
+        )
+
+    def test_exported_bank_can_be_imported_again(self):
+        step_test = create_step_test(3, TestQuestion.QuestionType.ORDERING)
+        for file_format, exported in (("jsonl", 3), ("csv", 6)):
+            response = self.client.get(
+                reverse("question-bank"),
+                {"steptest": step_test.pk, "file_format": file_format},
+            )
+            content = b"".join(
+                chunk if isinstance(chunk, bytes) else chunk.encode()
+                for chunk in response.streaming_content
+            )
+            upload = SimpleUploadedFile(f"bank.{file_format}", content)
+            response = self.client.post(
+                reverse("question-bank"),
+                {"file": upload, "file_format": file_format},
+                format="multipart",
+            )
+            self.assertEqual(response.data, {"imported": exported})
+        self.assertEqual(step_test.test_questions.count(), 12)
+        self.assertEqual(
+            TestAnswer.objects.filter(
+                test_quetion__steptest=step_test, order=3, is_correct=False
+            ).count(),
+            12,
+        )
+
+    def test_imports_are_all_or_nothing(self):
+        step_test = create_step_test(0)
+        record = {
+            "steptest": step_test.pk,
+            "question_type": TestQuestion.QuestionType.SINGLE,
+            "question": "<p>?</p>",
+            "answers": [
+                {"answer": "yes", "is_correct": "true"},
+                {"answer": "no", "is_correct": "false"},
+            ],
+        }
+        self.assertEqual(question_bank.import_questions([record], chunk_size=1), 1)
+        self.assertEqual(
+            list(TestAnswer.objects.values_list("answer", "is_correct")),
+            [("yes", True), ("no", False)],
+        )
+
+        broken = {**record, "answers": [{"answer": "maybe", "is_correct": "perhaps"}]}
+        with self.assertRaises(ValidationError):
+            question_bank.import_questions([record, broken], chunk_size=1)
+        self.assertEqual(step_test.test_questions.count(), 1)
+
+    def test_bad_uploads_are_rejected_with_the_line(self):
+        step_test = create_step_test(0)
+        record = {
+            "steptest": step_test.pk,
+            "question_type": TestQuestion.QuestionType.ORDERING,
+            "question": "<p>?</p>",
+            "answers": [{"answer": "first", "is_correct": False, "order": "first"}],
+        }
+        uploads = (
+            ("jsonl", json.dumps(record).encode(), "not a non-negative integer"),
+            ("jsonl", b"{}\n\xff\n", "Line 2 is not valid UTF-8"),
+            (
+                "csv",
+                ",".join(question_bank.CSV_FIELDS).encode()
+                + f"\n1,{step_test.pk},ordering,easy,?,a,0,-1\n".encode(),
+                "not a non-negative integer",
+            ),
+        )
+        for file_format, content, error in uploads:
+            response = self.client.post(
+                reverse("question-bank"),
+                {
+                    "file": SimpleUploadedFile(f"bank.{file_format}", content),
+                    "file_format": file_format,
+                },
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(error, str(response.data["file"]))
+        self.assertFalse(step_test.test_questions.exists())
+
+    def test_students_cannot_use_the_bank(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email="student@example.com", password="pass")
+        )
+        self.assertEqual(self.client.get(reverse("question-bank")).status_code, 403)
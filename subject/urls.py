@@ -4,10 +4,15 @@ from .views import (
     CategoryAPIView,
     CategoryListView,
     GetTestResultsView,
+    LeaderboardStandingView,
+    LeaderboardView,
+    QuestionBankView,
+    SaveTestAnswerView,
     StartStepTestView,
     StartSubjectApi,
     StepDetailAPIView,
     StepTestFinishView,
+    SubjectListView,
     SubmitTestView,
     TestQuestionViewSet,
     TestAnswerViewSet,
@@ -24,11 +29,34 @@ urlpatterns = [
     path("category/<int:pk>/", CategoryAPIView.as_view(), name="category-subject"),
     path("start-subject/<int:subject_id>/", StartSubjectApi.as_view(), name="start-subject"),
     path("categories/", CategoryListView.as_view(), name="categories"),
+    path("subjects/", SubjectListView.as_view(), name="subjects"),
     path("steps/<int:pk>/", StepDetailAPIView.as_view(), name="step-detail"),
     path("steps/start-test/", StartStepTestView.as_view(), name="step-start-test"),
-    path("subject/get-test/", GetTestResultsView.as_view(), name="get_test"),
+    path("subject/get-test/<int:result_id>/", GetTestResultsView.as_view(), name="get_test"),
+    path("step-test/answer/", SaveTestAnswerView.as_view(), name="save-test-answer"),
     path("step-test/submit/", SubmitTestView.as_view(), name="submit-test"),
     path("finish-step-test/", StepTestFinishView.as_view(), name="finish-step-test"),
+    path("question-bank/", QuestionBankView.as_view(), name="question-bank"),
+    path(
+        "leaderboard/step-test/<int:pk>/",
+        LeaderboardView.as_view(scope="step_test"),
+        name="step-test-leaderboard",
+    ),
+    path(
+        "leaderboard/step-test/<int:pk>/me/",
+        LeaderboardStandingView.as_view(scope="step_test"),
+        name="step-test-leaderboard-standing",
+    ),
+    path(
+        "leaderboard/subject/<int:pk>/",
+        LeaderboardView.as_view(scope="subject"),
+        name="subject-leaderboard",
+    ),
+    path(
+        "leaderboard/subject/<int:pk>/me/",
+        LeaderboardStandingView.as_view(scope="subject"),
+        name="subject-leaderboard-standing",
+    ),
 
     # Include the router's URL patterns
     path("api/", include(router.urls)),
@@ -1,4 +1,72 @@
-from subject.models import TestQuestion
+from django.db import transaction
+
+from common import richtext
+from common.cache import VersionedCache
+from subject import catalog
+from subject.models import Step, StepTest, TestAnswer, TestQuestion
+
+# Derived data of a step test's questions and answers, keyed by step test id.
+# The ALL_STEP_TESTS scope is bumped together with any step test.
+step_test_cache = VersionedCache("step-test")
+
+ALL_STEP_TESTS = "all"
+
+
+def bump_step_test_version(step_test_id):
+    """Invalidate the cached data of a step test once the transaction commits."""
+
+    def bump():
+        step_test_cache.bump(step_test_id)
+        step_test_cache.bump(ALL_STEP_TESTS)
+
+    transaction.on_commit(bump)
+
+
+def questions_etag(request, *args, **kwargs):
+    """ETag of question and answer responses, scoped to a ``steptest`` filter."""
+    scope = request.GET.get("steptest", "")
+    if not scope.isdigit():
+        scope = ALL_STEP_TESTS
+    return f"questions-{scope}-{step_test_cache.get_version(scope)}"
+
+
+# Rich-text field of each model that keeps a pre-rendered copy.
+RICH_TEXT_FIELDS = {
+    Step: "description",
+    TestQuestion: "question",
+    TestAnswer: "answer",
+}
+
+
+def prerender_rich_text(batch_size=500):
+    """
+    Re-render every stored rich-text body, one batch of rows at a time.
+
+    Step descriptions are served from the catalog cache, so the catalog is
+    invalidated along with every step test. Returns the number of processed
+    rows.
+    """
+    processed = 0
+    for model, field_name in RICH_TEXT_FIELDS.items():
+        fields = [f"{field_name}_rendered", f"{field_name}_text"]
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk)
+                .only("pk", field_name)
+                .order_by("pk")[:batch_size]
+            )
+            if not rows:
+                break
+            for row in rows:
+                richtext.prerender(row, field_name)
+            model.objects.bulk_update(rows, fields)
+            processed += len(rows)
+            last_pk = rows[-1].pk
+    for step_test_id in StepTest.objects.values_list("id", flat=True):
+        bump_step_test_version(step_test_id)
+    catalog.bump_version()
+    return processed
 
 
 def calculate_test_ball(level, question_ball):
@@ -1,9 +1,13 @@
-from django.db.models import Count, F, Q
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
-from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.generics import (
     CreateAPIView,
     ListAPIView,
@@ -16,9 +20,23 @@ from rest_framework.views import APIView
 
 from account.models import User
 from common import error_codes
+from common.pagination import CategoryPagination
+from common.throttling import TokenBucketThrottle
 from subject.models import *
 from subject.serializers import *
-from subject.utils import calculate_test_ball
+from subject import catalog, leaderboards, progress, question_bank
+from subject.clicks import record_click
+from subject.grading import (
+    attempt_rule,
+    check_submission,
+    grade_attempt,
+    record_answers,
+)
+from subject.papers import render_paper
+from subject.permissions import IsTeacher
+from subject.sampling import sample_question_ids
+from subject.submissions import enqueue_submission
+from subject.utils import questions_etag
 
 category_id = openapi.Parameter(
     name="category_id", in_=openapi.IN_QUERY, type=openapi.TYPE_INTEGER
@@ -26,38 +44,99 @@ category_id = openapi.Parameter(
 
 query = openapi.Parameter(name="query", in_=openapi.IN_QUERY, type=openapi.TYPE_STRING)
 
+# Conditional GETs answer 304 from a version counter before any query runs.
+catalog_condition = method_decorator(condition(etag_func=catalog.etag), name="get")
+
+
+class CachedCatalogListMixin:
+    catalog_part = None
+
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        data = catalog.get_or_build(
+            request,
+            self.catalog_part,
+            lambda: build(request, *args, **kwargs).data,
+            self.get_catalog_params(request),
+        )
+        return Response(data)
+
+    def get_catalog_params(self, request):
+        if self.paginator is None:
+            return None
+        return {
+            "cursor": self.paginator.decode_cursor(request, self.queryset.model),
+            "page_size": self.paginator.get_page_size(request),
+        }
+
 
-class CategoryListView(ListAPIView):
-    queryset = Category.objects.all().order_by("-click_count")
+@catalog_condition
+class CategoryListView(CachedCatalogListMixin, ListAPIView):
+    queryset = Category.objects.select_related("bg_image", "icon").order_by(
+        "-click_count", "id"
+    )
     serializer_class = CategorySerializer
+    pagination_class = CategoryPagination
+    catalog_part = "categories"
 
 
+@catalog_condition
 class CategoryAPIView(APIView):
     def get(self, request: Request, pk):
-        try:
-            category = Category.objects.filter(pk=pk).update(
-                click_count=F("click_count") + 1
-            )
-            category = Category.objects.get(pk=pk)
-            subjects = Subject.objects.filter(category=category)
-            category_serializer = SubjectSerializer(subjects, many=True)
-            return Response(category_serializer.data, status=status.HTTP_200_OK)
-
-        except Exception as e:
+        data = catalog.get_or_build(
+            request, "category-subjects", lambda: self.get_subjects_data(pk)
+        )
+        if data is None:
             return Response(
-                {"error": f"Category was not found {e}"},
+                {"error": f"Category was not found {pk}"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        return Response(data, status=status.HTTP_200_OK)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Revalidated views count as clicks too.
+        if request.method == "GET" and response.status_code in (200, 304):
+            record_click(kwargs["pk"])
+        return super().finalize_response(request, response, *args, **kwargs)
 
+    def get_subjects_data(self, pk):
+        try:
+            category = Category.objects.get(pk=pk)
+        except Category.DoesNotExist:
+            return None
+        subjects = Subject.objects.filter(category=category).select_related("image")
+        return SubjectSerializer(
+            subjects, many=True, context={"request": self.request}
+        ).data
 
+
+@method_decorator(condition(etag_func=questions_etag), name="list")
+@method_decorator(condition(etag_func=questions_etag), name="retrieve")
 class TestQuestionViewSet(viewsets.ModelViewSet):
     queryset = TestQuestion.objects.all()
     serializer_class = StepTestQuestionTestSerializer
     permission_classes = [IsAuthenticated]
+    stateless_auth = True
+
+    def get_filters(self):
+        filters = TestQuestionFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filters.validated_data
 
     def get_queryset(self):
-        # Optionally filter questions based on some conditions
-        return TestQuestion.objects.all()
+        filters = self.get_filters()
+        queryset = TestQuestion.objects.all()
+        for field in ("steptest", "level", "question_type"):
+            if field in filters:
+                queryset = queryset.filter(**{field: filters[field]})
+        if filters["view"] == "summary":
+            return queryset.defer("question", "question_rendered")
+        return queryset.prefetch_related("test_answers")
+
+    def get_serializer_class(self):
+        if self.action == "list" and self.get_filters()["view"] == "summary":
+            return TestQuestionSummarySerializer
+        return self.serializer_class
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -66,14 +145,35 @@ class TestQuestionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+@method_decorator(condition(etag_func=questions_etag), name="list")
+@method_decorator(condition(etag_func=questions_etag), name="retrieve")
 class TestAnswerViewSet(viewsets.ModelViewSet):
     queryset = TestAnswer.objects.all()
     serializer_class = TestAnswerSerializer
     permission_classes = [IsAuthenticated]
+    stateless_auth = True
+
+    def get_filters(self):
+        filters = TestAnswerFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filters.validated_data
 
     def get_queryset(self):
-        # Optionally filter answers based on some conditions
-        return TestAnswer.objects.all()
+        filters = self.get_filters()
+        queryset = TestAnswer.objects.all()
+        if "question" in filters:
+            queryset = queryset.filter(test_quetion=filters["question"])
+        if "steptest" in filters:
+            queryset = queryset.filter(test_quetion__steptest=filters["steptest"])
+        if filters["view"] == "summary":
+            return queryset.defer("answer", "answer_rendered", "answer_text")
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list" and self.get_filters()["view"] == "summary":
+            return TestAnswerSummarySerializer
+        return self.serializer_class
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -83,10 +183,11 @@ class TestAnswerViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-
-class SubjectListView(ListAPIView):
-    queryset = Subject.objects.all()
+@catalog_condition
+class SubjectListView(CachedCatalogListMixin, ListAPIView):
+    queryset = Subject.objects.select_related("image")
     serializer_class = SubjectSerializer
+    catalog_part = "subjects"
 
 
 class StartSubjectApi(APIView):
@@ -100,97 +201,82 @@ class StartSubjectApi(APIView):
             return Response(
                 {"error": "Subject not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        user_subject, created = UserSubject.objects.get_or_create(
-            user=user, subject=subject
-        )
+        user_subject, created = UserSubject.objects.select_related(
+            "subject"
+        ).get_or_create(user=user, subject=subject)
         if created:
             user_subject.started = True
             user_subject.save()
-        subject_serializer = UserSubjectSerializer(user_subject)
+            progress.start_subject(user_subject)
+        subject_serializer = UserSubjectSerializer(
+            user_subject,
+            context={
+                "step_percentages": progress.step_percentages(user.id, subject.id)
+            },
+        )
         return Response(data=subject_serializer.data, status=status.HTTP_200_OK)
 
 
 class StepDetailAPIView(RetrieveAPIView):
-    queryset = Step.objects.all().order_by("order")
+    queryset = Step.objects.prefetch_related("step_files__file")
     serializer_class = StepDetailSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = "pk"
+    stateless_auth = True
 
     def get(self, request, *args, **kwargs):
-
-        try:
-            step = self.get_object()
-            user_subject = UserSubject.objects.filter(
-                user=request.user, subject=step.subject, started=True
+        # The unlock gate runs before the catalog-wide ETag is compared.
+        access = progress.step_access(request.user, kwargs[self.lookup_field])
+        if access is None:
+            raise NotFound()
+        order, unlocked_order = access
+        if unlocked_order is None:
+            return Response(
+                data={"error": "You didn't start subject yet"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            if user_subject.exists():
-                if step.order == 1:
-                    serailizer = self.serializer_class(step)
-                    return Response(data=serailizer.data)
-                next_step = Step.objects.get(order=step.order - 1)
-                step_test = StepTest.objects.get(step=next_step)
-                user_test_results = UserTotalTestResult.objects.filter(
-                    step_test=step_test, user=request.user, ball__gte=60
-                ).order_by("-ball")
-                if user_test_results.exists():
-                    serializer_new = self.serializer_class(next_step)
-                    return Response(data=serializer_new.data)
-                return Response(
-                    data={"error": "You were not allowed to pass next step"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            else:
-                return Response(
-                    data={"error": "You didn't start subject yet"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        except Step.DoesNotExist:
-            raise ValidationError("Step does not exists")
-
-        except StepTest.DoesNotExist:
-            raise ValidationError("Steptest does not exists")
+        if order > unlocked_order:
+            return Response(
+                data={"error": "You were not allowed to pass next step"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self.get_unlocked(request, *args, **kwargs)
 
-        except Exception as e:
-            raise APIException(e)
+    @method_decorator(condition(etag_func=catalog.etag))
+    def get_unlocked(self, request, *args, **kwargs):
+        serializer = self.serializer_class(self.get_object())
+        return Response(data=serializer.data)
 
 
 class StartStepTestView(CreateAPIView):
     queryset = StepTest.objects.all()
     serializer_class = StartStepTestSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "step_test"
 
     def post(self, request, *args, **kwargs):
         try:
             step = request.data.get("step_id")
-            user_step = UserStep.objects.get(
-                user=request.user, step=step, finished=False
-            )
+            # Finished steps stay open, so a passed test can be retaken.
+            if not UserStep.objects.filter(user=request.user, step=step).exists():
+                return Response(
+                    data={"error": "You were not allowed to pass next step"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             step_test = StepTest.objects.get(step=step)
-            if step_test.test_type == StepTest.TestTypes.MIDTERM:
-                test_questions = TestQuestion.objects.filter(
-                    Q(steptest=step_test)
-                    & Q(
-                        Q(level=TestQuestion.QuestionLevel.EASY)
-                        | Q(level=TestQuestion.QuestionLevel.MEDIUM)
-                    )
-                ).order_by("?")[: step_test.question_count]
-            else:
-                test_questions = TestQuestion.objects.filter(
-                    Q(steptest=step_test) & Q(Q(level=TestQuestion.QuestionLevel.HARD))
-                ).order_by("?")[: step_test.question_count]
+            question_ids = sample_question_ids(step_test)
             user_test_result = UserTotalTestResult.objects.create(
                 step_test=step_test,
                 user=request.user,
+                question_ids=question_ids,
             )
-            user_step.finished = False
-            user_step.save(update_fields=["finished"])
-            data = {
-                "result_id": user_test_result.id,
-                "questions": StepTestQuestionTestSerializer(
-                    test_questions, many=True
-                ).data,
-            }
-            return Response(data=data)
+            return HttpResponse(
+                render_paper(user_test_result.id, step_test.id, question_ids),
+                content_type="application/json",
+            )
+        except StepTest.DoesNotExist:
+            raise NotFound("Step test not found")
         except Exception as e:
             raise APIException(e)
 
@@ -202,76 +288,62 @@ class StepTestFinishView(CreateAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user_total_test_result = self.queryset.filter(
-            id=serializer.validated_data["result_id"], user=request.user, finished=False
-        ).last()
-        if not user_total_test_result:
-            return Response(
-                data={"message": error_codes.USER_TOTAL_TEST_RESULT_MSG},
-                status=status.HTTP_404_NOT_FOUND,
+        with transaction.atomic():
+            user_total_test_result = (
+                self.queryset.select_for_update(of=("self",))
+                .select_related("step_test")
+                .filter(
+                    id=serializer.validated_data["result_id"],
+                    user=request.user,
+                    finished=False,
+                    submission__isnull=True,
+                )
+                .last()
             )
-        questions = serializer.validated_data["questions"]
-        total_ball = 0
-        for qst in questions:
-            question_ball = 0
-            question = TestQuestion.objects.get(id=qst["question_id"])
-            user_test_result = UserTestResult.objects.create(
-                user=request.user,
-                test_question=question,
-                total_result=user_total_test_result,
+            if not user_total_test_result:
+                return Response(
+                    data={"message": error_codes.USER_TOTAL_TEST_RESULT_MSG},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            if settings.ASYNC_TEST_SUBMISSIONS:
+                enqueue_submission(
+                    user_total_test_result,
+                    serializer.validated_data["questions"],
+                    "finish",
+                )
+                return Response(
+                    data={
+                        "result_id": user_total_test_result.id,
+                        "status": TestSubmission.Status.PENDING,
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
+            outcome = grade_attempt(
+                user_total_test_result,
+                serializer.validated_data["questions"],
+                attempt_rule(user_total_test_result, "finish"),
             )
-            if question.question_type == TestQuestion.QuestionType.MULTIPLE:
-                answers = question.test_answers.filter(id__in=qst["answer_ids"])
-                for ans in answers:
-                    user_test_result.test_answers.add(ans)
-                    if ans.is_correct == True:
-                        question_ball += calculate_test_ball(
-                            question.question_type,
-                            user_total_test_result.step_test.ball_for_each_test,
-                        )
-                    else:
-                        continue
-            else:
-                answer = question.test_answers.filter(id__in=qst["answer_ids"]).last()
-                user_test_result.test_answers.add(answer)
-                if answer.is_correct == True:
-                    question_ball += calculate_test_ball(
-                        question.question_type,
-                        user_total_test_result.step_test.ball_for_each_test,
-                    )
-
-            total_ball += question_ball
-
-        percentage = total_ball * 100 // len(questions)
-        user_total_test_result.percentage = percentage
-        user_total_test_result.ball = total_ball
-        user_total_test_result.save()
-        user_results = UserTestResult.objects.filter(
-            user=request.user, total_result=user_total_test_result
-        )
 
         data = {
-            "total_max_ball": len(questions)
+            "total_max_ball": outcome.question_count
             * user_total_test_result.step_test.ball_for_each_test,
-            "ball": user_total_test_result.ball,
-            "percentage": user_total_test_result.percentage,
-            "correct_answers_count": user_results.filter(
-                test_answers__is_correct=True
-            ).count(),
-            "incorrect_answers_count": user_results.filter(
-                test_answers__is_correct=False
-            ).count(),
+            "ball": outcome.ball,
+            "percentage": outcome.percentage,
+            "correct_answers_count": outcome.correct_answers_count,
+            "incorrect_answers_count": outcome.incorrect_answers_count,
             "questions": UserTestResultSerializer(
-                user_total_test_result.total_results.all(), many=True
+                user_total_test_result.total_results.prefetch_related("test_answers"),
+                many=True,
             ).data,
         }
         return Response(data=data)
 
 
 class GetTestResultsView(RetrieveAPIView):
-    queryset = UserTotalTestResult.objects.all()
+    queryset = UserTotalTestResult.objects.select_related("submission")
     serializer_class = UserTotalTestResultSerializer
     permission_classes = [IsAuthenticated]
+    stateless_auth = True
 
     def get(self, request, *args, **kwargs):
         result_id = kwargs.get("result_id")
@@ -283,6 +355,48 @@ class GetTestResultsView(RetrieveAPIView):
             raise NotFound("Test result not found")
 
 
+class SaveTestAnswerView(CreateAPIView):
+    queryset = UserTotalTestResult.objects.all()
+    serializer_class = SaveTestAnswerSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        question_id = serializer.validated_data["question_id"]
+
+        with transaction.atomic():
+            user_total_test_result = (
+                self.queryset.select_for_update(of=("self",))
+                .select_related("step_test")
+                .filter(
+                    id=serializer.validated_data["result_id"],
+                    user=request.user,
+                    finished=False,
+                    submission__isnull=True,
+                )
+                .first()
+            )
+            if not user_total_test_result:
+                return Response(
+                    data={"message": error_codes.USER_TOTAL_TEST_RESULT_MSG},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            submitted, keys = check_submission(
+                user_total_test_result, [serializer.validated_data]
+            )
+            record_answers(
+                user_total_test_result,
+                submitted,
+                keys,
+                attempt_rule(user_total_test_result, "submit"),
+            )
+
+        return Response(
+            {"result_id": user_total_test_result.id, "question_id": question_id}
+        )
+
+
 class SubmitTestView(CreateAPIView):
     queryset = UserTotalTestResult.objects.all()
     serializer_class = UserTestResultForSubmitSerializer
@@ -292,70 +406,127 @@ class SubmitTestView(CreateAPIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user_total_test_result = self.queryset.filter(
-            id=serializer.validated_data["result_id"], user=request.user, finished=False
-        ).first()
+        with transaction.atomic():
+            user_total_test_result = (
+                self.queryset.select_for_update(of=("self",))
+                .select_related("step_test")
+                .filter(
+                    id=serializer.validated_data["result_id"],
+                    user=request.user,
+                    finished=False,
+                    submission__isnull=True,
+                )
+                .first()
+            )
+            if not user_total_test_result:
+                return Response(
+                    data={
+                        "message": "Test natijalari topilmadi yoki allaqachon yakunlangan"
+                    },
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            if settings.ASYNC_TEST_SUBMISSIONS:
+                enqueue_submission(
+                    user_total_test_result,
+                    serializer.validated_data["test_question"],
+                    "submit",
+                )
+                return Response(
+                    data={
+                        "result_id": user_total_test_result.id,
+                        "status": TestSubmission.Status.PENDING,
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
 
-        if not user_total_test_result:
-            return Response(
-                data={
-                    "message": "Test natijalari topilmadi yoki allaqachon yakunlangan"
-                },
-                status=status.HTTP_404_NOT_FOUND,
+            outcome = grade_attempt(
+                user_total_test_result,
+                serializer.validated_data["test_question"],
+                attempt_rule(user_total_test_result, "submit"),
             )
 
-        questions = serializer.validated_data["test_question"]
-        total_ball = 0
+        return Response(
+            {
+                "message": "Test muvaffaqiyatli yakunlandi",
+                "ball": outcome.ball,
+                "percentage": outcome.percentage,
+            }
+        )
 
-        for qst in questions:
-            question_ball = 0
-            question = TestQuestion.objects.get(id=qst["question_id"])
-            user_test_result = UserTestResult.objects.create(
-                user=request.user,
-                test_question=question,
-                total_result=user_total_test_result,
-            )
 
-            if question.question_type == TestQuestion.QuestionType.MULTIPLE:
-                answers = question.test_answers.filter(id__in=qst["answer_ids"])
-                for ans in answers:
-                    user_test_result.test_answers.add(ans)
-                    if ans.is_correct:
-                        question_ball += (
-                            user_total_test_result.step_test.ball_for_each_test
-                        )
-            elif question.question_type == TestQuestion.QuestionType.ORDERING:
-                answers_order_list = []
-                for answer_id in qst["answer_ids"]:
-                    answers_order_list.append(
-                        question.test_answers.get(id=answer_id).order
-                    )
-
-                if answers_order_list == qst["answer_ids"]:
-                    question_ball += user_total_test_result.step_test.ball_for_each_test
-                else:
-                    continue
-
-            else:
-                answer = question.test_answers.filter(id__in=qst["answer_ids"]).first()
-                user_test_result.test_answers.add(answer)
-                if answer.is_correct:
-                    question_ball += user_total_test_result.step_test.ball_for_each_test
-
-            total_ball += question_ball
-
-        user_total_test_result.ball = total_ball
-        user_total_test_result.percentage = (
-            total_ball
-            / (len(questions) * user_total_test_result.step_test.ball_for_each_test)
-        ) * 100
-        user_total_test_result.finished = True
-        user_total_test_result.save()
+class LeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+    stateless_auth = True
+    scope = None
+
+    def get(self, request, pk):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        entries = leaderboards.top(self.scope, pk, query.validated_data["limit"])
+        ranks = {entry.pk: rank for rank, entry in enumerate(entries, start=1)}
+        return Response(
+            LeaderboardEntrySerializer(
+                entries, many=True, context={"ranks": ranks}
+            ).data
+        )
+
+
+class LeaderboardStandingView(APIView):
+    permission_classes = [IsAuthenticated]
+    scope = None
 
+    def get(self, request, pk):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        standing = leaderboards.standing(
+            self.scope, pk, request.user, query.validated_data["neighbors"]
+        )
+        if standing is None:
+            raise NotFound("You are not on this leaderboard yet")
+        rank = standing["rank"]
+        above, below = standing["above"], standing["below"]
+        entries = [*above, standing["entry"], *below]
+        first_rank = rank - len(above)
+        ranks = {
+            entry.pk: number for number, entry in enumerate(entries, start=first_rank)
+        }
         return Response(
             {
-                "message": "Test muvaffaqiyatli yakunlandi",
-                "ball": total_ball,
-                "percentage": user_total_test_result.percentage,
+                "rank": rank,
+                "entries": LeaderboardEntrySerializer(
+                    entries, many=True, context={"ranks": ranks}
+                ).data,
             }
         )
+
+
+class QuestionBankView(APIView):
+    permission_classes = [IsTeacher]
+
+    @swagger_auto_schema(query_serializer=QuestionBankExportSerializer)
+    def get(self, request):
+        serializer = QuestionBankExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        questions = TestQuestion.objects.all()
+        if "steptest" in serializer.validated_data:
+            questions = questions.filter(steptest=serializer.validated_data["steptest"])
+        file_format = serializer.validated_data["file_format"]
+        response = StreamingHttpResponse(
+            question_bank.export_questions(questions, file_format),
+            content_type="text/csv" if file_format == "csv" else "application/jsonl",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="question-bank.{file_format}"'
+        )
+        return response
+
+    @swagger_auto_schema(request_body=QuestionBankImportSerializer)
+    def post(self, request):
+        serializer = QuestionBankImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        records = question_bank.read_records(
+            question_bank.text_lines(serializer.validated_data["file"]),
+            serializer.validated_data["file_format"],
+        )
+        imported = question_bank.import_questions(records)
+        return Response({"imported": imported}, status=status.HTTP_201_CREATED)